@@ -4,6 +4,7 @@ Main application entry point
 """
 import signal
 import sys
+import time
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
@@ -11,8 +12,12 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
 import config
-from utils import log, initialize_directories, schedule_cleanup, shutdown_scheduler
+from utils import log, initialize_directories, schedule_cleanup, shutdown_scheduler, flush_logger, sample_request_logs
+from utils.metrics import request_duration
+from utils.storage import get_storage
+from utils.workers import get_conversion_pool, shutdown_conversion_pool, shutdown_formula_pool
 from routes import router
+from models import warm_formula_cache
 
 
 @asynccontextmanager
@@ -21,7 +26,10 @@ async def lifespan(app: FastAPI):
     # Startup
     log.info("Starting mdLaTeX2Word backend server")
     initialize_directories()
+    get_storage()
     schedule_cleanup()
+    warm_formula_cache()
+    get_conversion_pool()
     log.info(f"Server running on port {config.PORT}")
     log.info(f"Environment: {config.ENVIRONMENT}")
     
@@ -30,7 +38,10 @@ async def lifespan(app: FastAPI):
     # Shutdown
     log.info("Shutting down server")
     shutdown_scheduler()
+    shutdown_conversion_pool()
+    shutdown_formula_pool()
     log.info("Server shutdown complete")
+    flush_logger()
 
 
 # Create FastAPI app
@@ -55,16 +66,34 @@ app.add_middleware(
 # Request logging middleware
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    """Log all incoming requests"""
-    log.info(
-        f"{request.method} {request.url.path}",
-        extra={
-            "ip": request.client.host if request.client else "unknown",
-            "user_agent": request.headers.get("user-agent", "unknown")
-        }
-    )
-    response = await call_next(request)
-    return response
+    """Log incoming requests (sampled under load) and record their latency
+    
+    The sampling decision also applies to the INFO lines the request's
+    handler logs with ``log_request``.
+    """
+    if sample_request_logs():
+        log.info(
+            f"{request.method} {request.url.path}",
+            extra={
+                "ip": request.client.host if request.client else "unknown",
+                "user_agent": request.headers.get("user-agent", "unknown")
+            }
+        )
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template so path parameters do not create new series
+        route = request.scope.get('route')
+        request_duration.observe(
+            time.perf_counter() - start,
+            request.method,
+            route.path if route is not None else 'unmatched',
+            str(status)
+        )
 
 
 # Mount API routes
@@ -82,7 +111,12 @@ async def root():
             "upload": "POST /api/upload",
             "convert": "POST /api/convert",
             "convertContent": "POST /api/convert-content",
+            "convertBatch": "POST /api/convert-batch",
+            "submitJob": "POST /api/jobs",
+            "jobStatus": "GET /api/jobs/:jobId",
             "download": "GET /api/download/:filename",
+            "stats": "GET /api/stats",
+            "metrics": "GET /api/metrics",
             "health": "GET /api/health"
         }
     }
@@ -132,6 +166,9 @@ def signal_handler(sig, frame):
     """Handle shutdown signals"""
     log.info(f"Received signal {sig}, shutting down gracefully")
     shutdown_scheduler()
+    shutdown_conversion_pool()
+    shutdown_formula_pool()
+    flush_logger()
     sys.exit(0)
 
 
@@ -0,0 +1,81 @@
+"""
+Benchmark: LaTeX to OMML rendering paths
+
+Renders every formula in a Markdown file (backend/latex-sample.md by
+default) through the MathML string round trip (latex2mathml string ->
+lxml parse -> OMML) and through the direct element-tree path used by
+convert_latex_to_omml, bypassing the formula cache. Also checks that both
+paths produce identical OMML.
+
+Usage: python benchmarks/bench_formula.py [markdown_file] [repeats]
+"""
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from lxml import etree
+
+from models.converter import (
+    latex_to_mathml,
+    mathml_to_omml,
+    parse_markdown,
+    _render_latex_to_omml
+)
+
+DEFAULT_SAMPLE = Path(__file__).resolve().parent.parent / 'latex-sample.md'
+
+
+def collect_formulas(markdown: str) -> list:
+    """All math_inline/math_block contents in document order"""
+    formulas = []
+    for token in parse_markdown(markdown):
+        if token.type in ('math_block', 'math_block_eqno') and token.content:
+            formulas.append(token.content)
+        for child in token.children or []:
+            if child.type == 'math_inline' and child.content:
+                formulas.append(child.content)
+    return formulas
+
+
+def string_path(latex: str):
+    return mathml_to_omml(latex_to_mathml(latex))
+
+
+def run(render, formulas: list, repeats: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for latex in formulas:
+            render(latex)
+    return time.perf_counter() - start
+
+
+def serialize(omml) -> bytes:
+    return etree.tostring(omml) if omml is not None else b''
+
+
+def main():
+    sample = Path(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SAMPLE
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    formulas = collect_formulas(sample.read_text(encoding='utf-8'))
+    identical = sum(
+        serialize(string_path(latex)) == serialize(_render_latex_to_omml(latex))
+        for latex in formulas
+    )
+
+    calls = len(formulas) * repeats
+    old = run(string_path, formulas, repeats)
+    new = run(_render_latex_to_omml, formulas, repeats)
+
+    print(f"Formulas:           {len(formulas)} from {sample.name} x {repeats} repeats")
+    print(f"Identical output:   {identical}/{len(formulas)}")
+    print(f"MathML string path: {old / calls * 1e6:8.1f} us/formula")
+    print(f"Direct tree path:   {new / calls * 1e6:8.1f} us/formula")
+    print(f"Speedup:            {old / new:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark: inline run coalescing on prose-heavy documents
+
+Builds paragraphs of hard-wrapped prose (one soft break per line, as
+written by most editors) and adds their inline content to a document
+twice: with parse_inline_content, which coalesces adjacent children into
+one run per formatting and turns breaks into w:br elements, and with a
+copy of the previous one-run-per-child loop. Reports build time, runs
+and document.xml size for both.
+
+Usage: python benchmarks/bench_inline_runs.py [paragraphs] [lines per paragraph]
+"""
+import sys
+import time
+import zipfile
+from io import BytesIO
+from pathlib import Path
+
+# Add backend to path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from docx import Document
+
+from models.converter import parse_inline_content, parse_markdown
+
+LINE = "The quick brown fox jumps over the lazy dog while the conversion keeps going"
+
+
+def prose(paragraphs: int, lines: int) -> str:
+    paragraph = '\n'.join(f"{LINE} {n}." for n in range(lines))
+    return '\n\n'.join(paragraph for _ in range(paragraphs))
+
+
+def per_child_runs(paragraph, inline_token, force_bold: bool = False) -> None:
+    """The previous loop: one run per text child and per break"""
+    for child in inline_token.children:
+        if child.type == 'text':
+            run = paragraph.add_run(child.content)
+            if force_bold:
+                run.bold = True
+        elif child.type in ('softbreak', 'hardbreak'):
+            paragraph.add_run('\n')
+        elif child.content:
+            paragraph.add_run(child.content)
+
+
+def build(inline_tokens, add_inline) -> tuple:
+    doc = Document()
+    start = time.perf_counter()
+    for token in inline_tokens:
+        add_inline(doc.add_paragraph(), token)
+    elapsed = time.perf_counter() - start
+
+    runs = sum(1 for _ in doc.element.body.iter('{*}r'))
+    output = BytesIO()
+    doc.save(output)
+    with zipfile.ZipFile(output) as package:
+        size = len(package.read('word/document.xml'))
+    return elapsed, runs, size
+
+
+def main():
+    paragraphs = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    lines = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+    tokens = [token for token in parse_markdown(prose(paragraphs, lines)) if token.type == 'inline']
+
+    print(f"{paragraphs} paragraphs of {lines} lines")
+    print(f"{'mode':>10} {'build (s)':>10} {'runs':>8} {'document.xml (KB)':>18}")
+    for mode, add_inline in (('per-child', per_child_runs), ('coalesced', parse_inline_content)):
+        elapsed, runs, size = build(tokens, add_inline)
+        print(f"{mode:>10} {elapsed:>10.3f} {runs:>8} {size / 1024:>18.0f}")
+
+
+if __name__ == "__main__":
+    main()
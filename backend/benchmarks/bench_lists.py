@@ -0,0 +1,60 @@
+"""
+Benchmark: list-heavy documents
+
+Converts Markdown with many short ordered and bullet lists (some nested)
+and reports the token walk time, the size of numbering.xml and the time
+python-docx needs to open the saved document again.
+
+Usage: python benchmarks/bench_lists.py [lists ...]
+"""
+import sys
+import time
+import zipfile
+from io import BytesIO
+from pathlib import Path
+
+# Add backend to path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from docx import Document
+
+from models.converter import parse_markdown, tokens_to_docx_paragraphs
+
+
+def make_lists(count: int) -> str:
+    blocks = []
+    for n in range(count):
+        if n % 2:
+            blocks.append(f"- bullet {n} a\n- bullet {n} b\n  - nested {n}\n")
+        else:
+            blocks.append(f"1. item {n} a\n2. item {n} b\n")
+        blocks.append(f"Paragraph {n} between lists.\n")
+    return '\n'.join(blocks)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100, 500, 2000]
+
+    print(f"{'lists':>8} {'walk (s)':>10} {'us/list':>9} {'numbering.xml (KB)':>20} {'reopen (ms)':>12}")
+    for count in sizes:
+        tokens = parse_markdown(make_lists(count))
+        doc = Document()
+
+        start = time.perf_counter()
+        tokens_to_docx_paragraphs(doc, tokens)
+        walk = time.perf_counter() - start
+
+        buffer = BytesIO()
+        doc.save(buffer)
+        with zipfile.ZipFile(BytesIO(buffer.getvalue())) as zf:
+            numbering_kb = len(zf.read('word/numbering.xml')) / 1024
+
+        start = time.perf_counter()
+        Document(BytesIO(buffer.getvalue()))
+        reopen = time.perf_counter() - start
+
+        print(f"{count:>8} {walk:>10.3f} {walk / count * 1e6:>9.0f} {numbering_kb:>20.1f} {reopen * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
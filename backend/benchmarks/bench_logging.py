@@ -0,0 +1,102 @@
+"""
+Benchmark: request throughput with logging off, synchronous and in the background
+
+Sends concurrent requests to the app in-process (no network) and reports
+requests per second for each logging mode:
+
+- off: no log sinks at all
+- sync: every line formatted, written and flushed on the request path
+- background: lines queued and written in batches by the writer thread
+
+Log files go to a temporary directory. Console output goes to /dev/null
+and, in a second round, to a stream that takes CONSOLE_DELAY seconds per
+write, like a terminal or a log collector pipe that has fallen behind.
+
+Usage: python benchmarks/bench_logging.py [requests] [concurrency]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+
+# Add backend to path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import httpx
+from loguru import logger
+
+import config
+import utils
+from app import app
+
+CONTENT = "# Title\n\nSome **bold** text with $x^2$.\n"
+CONSOLE_DELAY = 0.0005
+
+
+class SlowConsole:
+    """Discards output but blocks for CONSOLE_DELAY on every write"""
+
+    def write(self, text: str) -> int:
+        time.sleep(CONSOLE_DELAY)
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+
+async def run_requests(total: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        remaining = iter(range(total))
+
+        async def worker():
+            for n in remaining:
+                if n % 2:
+                    response = await client.get("/api/health")
+                else:
+                    response = await client.post(
+                        "/api/convert-content", json={"content": CONTENT, "inline": True}
+                    )
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - start
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    config.LOGS_DIR = Path(tempfile.mkdtemp(prefix="bench_logs_"))
+
+    print(f"{total} requests, concurrency {concurrency}")
+    print(f"{'console':>8} {'mode':>12} {'req/s':>10} {'combined.log lines':>20}")
+    for console in ('devnull', 'slow'):
+        for mode in ('off', 'sync', 'background'):
+            for name in os.listdir(config.LOGS_DIR):
+                os.unlink(config.LOGS_DIR / name)
+
+            with open(os.devnull, 'w') as devnull:
+                stream = devnull if console == 'devnull' else SlowConsole()
+                with redirect_stdout(stream):
+                    if mode == 'off':
+                        logger.remove()
+                        utils.shutdown_logger()
+                    else:
+                        utils.setup_logger(background=(mode == 'background'))
+                    # Warm up caches and the pool
+                    asyncio.run(run_requests(50, concurrency))
+                    elapsed = asyncio.run(run_requests(total, concurrency))
+                    utils.shutdown_logger()
+                    logger.remove()
+
+            combined = config.LOGS_DIR / "combined.log"
+            lines = sum(1 for _ in open(combined)) if combined.exists() else 0
+            print(f"{console:>8} {mode:>12} {total / elapsed:>10.0f} {lines:>20}")
+
+
+if __name__ == "__main__":
+    main()
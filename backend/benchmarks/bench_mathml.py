@@ -0,0 +1,58 @@
+"""
+Micro-benchmark: MathML to OMML conversion cost per node
+
+Builds deeply nested fractions and large matrices, converts their MathML
+trees to OMML repeatedly and reports the time per MathML node. LaTeX
+parsing is done once up front, so only mathml_tree_to_omml is measured.
+
+Usage: python benchmarks/bench_mathml.py [repeats]
+"""
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from models.converter import latex_to_mathml_tree, mathml_tree_to_omml
+
+
+def nested_fraction(depth: int) -> str:
+    latex = 'x'
+    for level in range(depth):
+        latex = f'\\frac{{a_{level} + {latex}}}{{b^{level} - \\sqrt{{c}}}}'
+    return latex
+
+
+def matrix(size: int) -> str:
+    rows = [' & '.join(f'x_{{{r}{c}}}^2' for c in range(size)) for r in range(size)]
+    return '\\begin{pmatrix}' + ' \\\\ '.join(rows) + '\\end{pmatrix}'
+
+
+CASES = {
+    'nested fractions (depth 8)': nested_fraction(8),
+    'nested fractions (depth 16)': nested_fraction(16),
+    'matrix 6x6': matrix(6),
+    'matrix 12x12': matrix(12),
+    'sum with limits': '\\sum_{i=0}^{n} \\int_{0}^{\\infty} \\frac{x^i}{i!} dx' * 4,
+}
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    print(f"{'case':<30} {'nodes':>7} {'us/formula':>12} {'ns/node':>9}")
+    for name, latex in CASES.items():
+        tree = latex_to_mathml_tree(latex)
+        nodes = sum(1 for _ in tree.iter())
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            mathml_tree_to_omml(tree, decode_entities=True)
+        elapsed = time.perf_counter() - start
+
+        print(f"{name:<30} {nodes:>7} {elapsed / repeats * 1e6:>12.1f} {elapsed / repeats / nodes * 1e9:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
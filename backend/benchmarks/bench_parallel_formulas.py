@@ -0,0 +1,75 @@
+"""
+Benchmark: parallel formula pre-pass
+
+Scales backend/latex-sample.md up to a formula-heavy document (every copy
+gets its own variant of each formula, so nothing is served from the
+formula cache; the persistent formula store is disabled) and converts it
+with serial rendering and with the formula pool at several worker counts.
+Checks that all runs produce the same document.xml.
+
+Usage: python benchmarks/bench_parallel_formulas.py [copies] [workers ...]
+"""
+import re
+import sys
+import time
+import zipfile
+from io import BytesIO
+from pathlib import Path
+
+# Add backend to path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import config
+from models.converter import _formula_cache, convert_markdown_content_to_bytes
+from utils.workers import get_formula_pool, shutdown_formula_pool
+
+SAMPLE = Path(__file__).resolve().parent.parent / 'latex-sample.md'
+_INLINE_MATH_RE = re.compile(r'\$([^$\n]+)\$')
+
+
+def scaled_sample(copies: int) -> str:
+    sample = SAMPLE.read_text(encoding='utf-8')
+    parts = []
+    for n in range(copies):
+        parts.append(_INLINE_MATH_RE.sub(lambda m: f"${m.group(1)} + {n}$", sample))
+    return '\n\n'.join(parts)
+
+
+def convert(markdown: str, workers: int) -> tuple:
+    config.FORMULA_WORKERS = workers
+    config.BLOCK_CACHE_SIZE = 0
+    _formula_cache.clear()
+    start = time.perf_counter()
+    data = convert_markdown_content_to_bytes(markdown)
+    elapsed = time.perf_counter() - start
+    with zipfile.ZipFile(BytesIO(data)) as package:
+        return elapsed, package.read('word/document.xml')
+
+
+def main():
+    copies = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    worker_counts = [int(arg) for arg in sys.argv[2:]] or [2, 4]
+    markdown = scaled_sample(copies)
+    config.FORMULA_PARALLEL_MIN = 1
+    config.FORMULA_STORE_PATH = ''
+    config.FORMULA_CACHE_SIZE = max(config.FORMULA_CACHE_SIZE, copies * 32)
+    _formula_cache.max_entries = config.FORMULA_CACHE_SIZE
+
+    serial, reference = convert(markdown, 1)
+    print(f"{copies} copies, {len(_formula_cache)} distinct formulas")
+    print(f"{'workers':>8} {'convert (s)':>12} {'speedup':>8}")
+    print(f"{1:>8} {serial:>12.2f} {1:>8.2f}")
+
+    for workers in worker_counts:
+        shutdown_formula_pool()
+        config.FORMULA_WORKERS = workers
+        # Start the worker processes outside the timed run
+        list(get_formula_pool().map(abs, range(workers)))
+        elapsed, document = convert(markdown, workers)
+        assert document == reference, "parallel rendering changed document.xml"
+        print(f"{workers:>8} {elapsed:>12.2f} {serial / elapsed:>8.2f}")
+    shutdown_formula_pool()
+
+
+if __name__ == "__main__":
+    main()
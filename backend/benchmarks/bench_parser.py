@@ -0,0 +1,55 @@
+"""
+Micro-benchmark: per-request Markdown parser setup cost
+
+Compares building a new MarkdownIt instance for every parse (the previous
+behaviour of parse_markdown) with the shared parser from get_markdown_parser.
+
+Usage: python benchmarks/bench_parser.py [iterations]
+"""
+import sys
+import timeit
+from pathlib import Path
+
+# Add backend to path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from markdown_it import MarkdownIt
+from mdit_py_plugins.texmath import texmath_plugin
+
+from models.converter import get_markdown_parser
+
+SAMPLE = """# Title
+
+Some text with $x^2$ inline math and **bold** words.
+
+| a | b |
+| --- | --- |
+| 1 | 2 |
+"""
+
+
+def build_parser() -> MarkdownIt:
+    return (
+        MarkdownIt('commonmark', {'breaks': True, 'html': True})
+        .use(texmath_plugin, delimiters='dollars')
+        .enable('table')
+    )
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    fresh = timeit.timeit(lambda: build_parser().parse(SAMPLE), number=iterations)
+    get_markdown_parser()
+    shared = timeit.timeit(lambda: get_markdown_parser().parse(SAMPLE), number=iterations)
+    setup = timeit.timeit(build_parser, number=iterations)
+
+    print(f"Iterations:               {iterations}")
+    print(f"Parser construction only: {setup / iterations * 1e6:8.1f} us/request")
+    print(f"New parser per request:   {fresh / iterations * 1e6:8.1f} us/request")
+    print(f"Shared parser:            {shared / iterations * 1e6:8.1f} us/request")
+    print(f"Speedup:                  {fresh / shared:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark: table construction scaling
+
+Converts Markdown tables of increasing size and reports time per row for
+the one-pass table builder and, for smaller sizes, the previous approach
+of filling cells through python-docx's table.cell(row, col).
+
+Usage: python benchmarks/bench_table.py [rows ...]
+"""
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from docx import Document
+
+from models.converter import parse_markdown, tokens_to_docx_paragraphs, parse_inline_content
+
+COLUMNS = 4
+# table.cell() rebuilds the whole cell grid per call; larger sizes take many minutes
+LEGACY_MAX_ROWS = 300
+
+
+def make_table(rows: int) -> str:
+    header = '| ' + ' | '.join(f'H{c}' for c in range(COLUMNS)) + ' |'
+    sep = '|' + ' --- |' * COLUMNS
+    body = [
+        '| ' + ' | '.join(f'r{r} c{c} **b**' for c in range(COLUMNS)) + ' |'
+        for r in range(rows)
+    ]
+    return '\n'.join([header, sep] + body) + '\n'
+
+
+def legacy_fill(doc, tokens) -> None:
+    """Fill a table cell by cell through table.cell() (previous behaviour)"""
+    rows = sum(1 for t in tokens if t.type == 'tr_open')
+    table = doc.add_table(rows=rows, cols=COLUMNS)
+    row_idx = col_idx = -1
+    for i, t in enumerate(tokens):
+        if t.type == 'tr_open':
+            row_idx += 1
+            col_idx = -1
+        elif t.type in ('th_open', 'td_open'):
+            col_idx += 1
+            cell = table.cell(row_idx, col_idx)
+            parse_inline_content(cell.paragraphs[0], tokens[i + 1], force_bold=t.type == 'th_open')
+
+
+def timed(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100, 300, 1000, 10000]
+
+    print(f"{'rows':>8} {'one-pass (s)':>14} {'us/row':>10} {'table.cell (s)':>16} {'us/row':>10}")
+    for rows in sizes:
+        tokens = parse_markdown(make_table(rows))
+        fast = timed(tokens_to_docx_paragraphs, Document(), tokens)
+
+        legacy = '-'
+        legacy_per_row = '-'
+        if rows <= LEGACY_MAX_ROWS:
+            elapsed = timed(legacy_fill, Document(), tokens)
+            legacy = f"{elapsed:.3f}"
+            legacy_per_row = f"{elapsed / rows * 1e6:.0f}"
+
+        print(f"{rows:>8} {fast:>14.3f} {fast / rows * 1e6:>10.0f} {legacy:>16} {legacy_per_row:>10}")
+
+
+if __name__ == "__main__":
+    main()
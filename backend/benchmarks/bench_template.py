@@ -0,0 +1,58 @@
+"""
+Benchmark: per-conversion document setup time
+
+Compares opening python-docx's bundled template with Document() for each
+conversion against cloning the cached, already parsed template.
+
+Usage: python benchmarks/bench_template.py [iterations] [reference.docx]
+"""
+import sys
+import timeit
+from pathlib import Path
+
+# Add backend to path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from docx import Document
+
+from models.templates import template_cache
+
+
+def report(label: str, seconds: float, iterations: int) -> float:
+    per_call = seconds / iterations * 1000
+    print(f"{label:<34} {per_call:8.2f} ms/conversion")
+    return per_call
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    reference = sys.argv[2] if len(sys.argv) > 2 else None
+
+    print(f"Iterations: {iterations}")
+    fresh = report("Document() per conversion", timeit.timeit(Document, number=iterations), iterations)
+
+    template_cache.new_document()
+    cached = report(
+        "Cached default template clone",
+        timeit.timeit(template_cache.new_document, number=iterations),
+        iterations
+    )
+    print(f"{'Speedup':<34} {fresh / cached:8.2f}x")
+
+    if reference:
+        fresh = report(
+            "Document(reference) per conversion",
+            timeit.timeit(lambda: Document(reference), number=iterations),
+            iterations
+        )
+        template_cache.new_document(reference)
+        cached = report(
+            "Cached reference template clone",
+            timeit.timeit(lambda: template_cache.new_document(reference), number=iterations),
+            iterations
+        )
+        print(f"{'Speedup':<34} {fresh / cached:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -18,6 +18,10 @@ LOGS_DIR = BASE_DIR / 'logs'
 # File size limits (10MB)
 MAX_FILE_SIZE = 10 * 1024 * 1024
 
+# Batch conversion limits (number of documents and total input size)
+BATCH_MAX_FILES = int(os.getenv('BATCH_MAX_FILES', 500))
+BATCH_MAX_SIZE = int(os.getenv('BATCH_MAX_SIZE', 100 * 1024 * 1024))
+
 # Allowed file extensions
 ALLOWED_EXTENSIONS = ['.md', '.markdown', '.tex']
 
@@ -25,6 +29,68 @@ ALLOWED_EXTENSIONS = ['.md', '.markdown', '.tex']
 CLEANUP_INTERVAL_SECONDS = 60 * 60  # 1 hour
 FILE_MAX_AGE_SECONDS = 60 * 60  # 1 hour
 
+# Storage backend for uploads and outputs: 'filesystem' keeps them in
+# UPLOAD_DIR/OUTPUT_DIR, 's3' in an S3-compatible bucket shared by all replicas
+# (requires boto3; credentials come from the standard AWS_* environment
+# variables, S3_ENDPOINT_URL points at MinIO or another S3-compatible store)
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'filesystem').lower()
+S3_BUCKET = os.getenv('S3_BUCKET', 'mdlatex2word')
+S3_PREFIX = os.getenv('S3_PREFIX', '')
+S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL') or None
+S3_REGION = os.getenv('S3_REGION') or None
+S3_CREATE_BUCKET = os.getenv('S3_CREATE_BUCKET', 'false').lower() in ('1', 'true', 'yes')
+
+# Conversion worker pool configuration
+# CONVERSION_EXECUTOR is 'thread' or 'process'; queue size bounds the number of
+# conversions waiting for a worker before new requests are rejected with 503
+CONVERSION_EXECUTOR = os.getenv('CONVERSION_EXECUTOR', 'thread')
+CONVERSION_WORKERS = int(os.getenv('CONVERSION_WORKERS', os.cpu_count() or 1))
+CONVERSION_QUEUE_SIZE = int(os.getenv('CONVERSION_QUEUE_SIZE', 16))
+CONVERSION_TIMEOUT_SECONDS = float(os.getenv('CONVERSION_TIMEOUT_SECONDS', 120))
+
+# Converted output cache for /api/convert-content (0 entries disables it)
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv('RESULT_CACHE_MAX_ENTRIES', 256))
+RESULT_CACHE_MAX_BYTES = int(os.getenv('RESULT_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+# Rendered LaTeX formula cache (number of distinct formulas kept in memory)
+FORMULA_CACHE_SIZE = int(os.getenv('FORMULA_CACHE_SIZE', 4096))
+
+# Documents with at least FORMULA_PARALLEL_MIN distinct uncached formulas
+# render them on FORMULA_WORKERS processes before the token walk (below 2
+# workers disables parallel rendering)
+FORMULA_WORKERS = int(os.getenv('FORMULA_WORKERS', min(4, os.cpu_count() or 1)))
+FORMULA_PARALLEL_MIN = int(os.getenv('FORMULA_PARALLEL_MIN', 200))
+
+# Persistent formula store (SQLite) shared by all workers and kept across
+# restarts; an empty path disables it. The least recently used entries are
+# pruned above FORMULA_STORE_MAX_ENTRIES, and the FORMULA_STORE_WARM most used
+# formulas are loaded into memory at startup
+FORMULA_STORE_PATH = os.getenv('FORMULA_STORE_PATH', str(BASE_DIR / 'cache' / 'formulas.sqlite3'))
+FORMULA_STORE_MAX_ENTRIES = int(os.getenv('FORMULA_STORE_MAX_ENTRIES', 100000))
+FORMULA_STORE_WARM = int(os.getenv('FORMULA_STORE_WARM', 2048))
+
+# Rendered top-level block cache, reused when the same Markdown block is
+# converted again (entries, and total Markdown characters of cached blocks)
+BLOCK_CACHE_SIZE = int(os.getenv('BLOCK_CACHE_SIZE', 2048))
+BLOCK_CACHE_MAX_CHARS = int(os.getenv('BLOCK_CACHE_MAX_CHARS', 4 * 1024 * 1024))
+
+# Markdown files at least this large are converted by the streaming writer,
+# in chunks of about STREAMING_CHUNK_CHARS characters (0 disables streaming)
+STREAMING_THRESHOLD_BYTES = int(os.getenv('STREAMING_THRESHOLD_BYTES', 8 * 1024 * 1024))
+STREAMING_CHUNK_CHARS = int(os.getenv('STREAMING_CHUNK_CHARS', 256 * 1024))
+
+# Reference .docx whose styles, page setup and numbering are used for all
+# conversions (defaults to python-docx's bundled template)
+REFERENCE_DOCX = os.getenv('REFERENCE_DOCX') or None
+TEMPLATE_CACHE_SIZE = int(os.getenv('TEMPLATE_CACHE_SIZE', 8))
+
+# Logging: LOG_BACKGROUND writes log lines in batches from a background thread
+# instead of on the request path; above LOG_SAMPLE_THRESHOLD requests per
+# second only one in LOG_SAMPLE_EVERY gets its access log line (0 logs all)
+LOG_BACKGROUND = os.getenv('LOG_BACKGROUND', 'true').lower() in ('1', 'true', 'yes')
+LOG_SAMPLE_THRESHOLD = int(os.getenv('LOG_SAMPLE_THRESHOLD', 200))
+LOG_SAMPLE_EVERY = int(os.getenv('LOG_SAMPLE_EVERY', 10))
+
 # CORS configuration
 FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:5173')
 CORS_ORIGINS = [FRONTEND_URL]
@@ -1,59 +1,170 @@
 """
 API Controllers for mdLaTeX2Word backend
 """
+import asyncio
+import json
+import zipfile
+from functools import partial
 from pathlib import Path
-from typing import Optional
-from fastapi import UploadFile, HTTPException
-from fastapi.responses import FileResponse
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from fastapi import HTTPException, Request, UploadFile
+from fastapi.responses import FileResponse, Response, StreamingResponse
 
 import config
-from utils import log, generate_unique_filename, is_valid_file_extension
-from models.converter import convert_markdown_to_word, convert_markdown_content_to_word
+from utils import log, log_request, is_valid_file_extension, sanitize_filename
+from utils.archive import StreamingZipWriter, read_zip_inputs
+from utils.cache import result_cache, upload_digests
+from utils.jobs import job_store
+from utils.metrics import DirectorySize, observe_conversion, registry as metrics_registry
+from utils.storage import OUTPUTS, UPLOADS, Storage, get_storage
+from utils.uploads import receive_upload
+from utils.workers import PoolFullError, get_conversion_pool
+from models.converter import (
+    CONVERTER_VERSION,
+    convert_markdown_to_word,
+    convert_markdown_content_to_word,
+    convert_markdown_content_to_bytes,
+    get_block_cache_stats,
+    get_formula_cache_stats,
+    get_formula_store_stats
+)
+from models.stats import collect_stats, conversion_stats, run_with_stats
+from models.templates import template_identity
 
+DOCX_MEDIA_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+PROMETHEUS_MEDIA_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# How long a batch entry waits before retrying when the conversion queue is full
+BATCH_RETRY_SECONDS = 0.5
 
-async def upload_file(file: UploadFile) -> dict:
-    """Handle file upload"""
+
+async def run_conversion(func: Callable, *args, on_abandon: Optional[Callable[[], None]] = None) -> Any:
+    """Run a blocking conversion on the worker pool
+
+    Rejects with 503 when the conversion queue is full and 504 when the
+    conversion exceeds CONVERSION_TIMEOUT_SECONDS; ``on_abandon`` is called
+    once a timed out conversion that was already running finishes.
+    """
+    pool = get_conversion_pool()
     try:
-        if not file:
-            log.warning("Upload attempt with no file")
-            raise HTTPException(status_code=400, detail="No file uploaded")
-        
-        # Validate file extension
-        if not is_valid_file_extension(file.filename):
-            log.warning(f"Rejected file with invalid extension: {file.filename}")
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid file type. Allowed types: {', '.join(config.ALLOWED_EXTENSIONS)}"
-            )
-        
-        # Generate unique filename
-        unique_filename = generate_unique_filename(file.filename)
-        file_path = config.UPLOAD_DIR / unique_filename
-        
-        # Save file
-        content = await file.read()
-        
-        # Check file size
-        if len(content) > config.MAX_FILE_SIZE:
-            log.warning(f"File too large: {len(content)} bytes")
-            raise HTTPException(
-                status_code=400,
-                detail=f"File too large. Maximum size is {config.MAX_FILE_SIZE / 1024 / 1024}MB"
-            )
+        return await pool.run(
+            func, *args,
+            timeout=config.CONVERSION_TIMEOUT_SECONDS,
+            on_abandon=on_abandon
+        )
+    except PoolFullError as e:
+        log.warning(f"Rejected conversion: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy, please retry shortly",
+            headers={"Retry-After": "5"}
+        )
+    except asyncio.TimeoutError:
+        log.warning(f"Conversion timed out after {config.CONVERSION_TIMEOUT_SECONDS}s")
+        raise HTTPException(status_code=504, detail="Conversion timed out")
+
+
+def _record_conversion(stats: Dict[str, Any], input_bytes: int, source: str) -> None:
+    """Add a finished conversion to /api/stats and /api/metrics"""
+    conversion_stats.record(stats)
+    observe_conversion(stats, input_bytes, source)
+
+
+async def run_instrumented_conversion(
+    func: Callable,
+    *args,
+    input_bytes: int,
+    source: str,
+    on_abandon: Optional[Callable[[], None]] = None
+) -> Tuple[Any, Dict[str, Any]]:
+    """Run a conversion like run_conversion and return ``(result, stats)``
+
+    The per-stage timings and counts are also added to the process-wide
+    aggregates; ``source`` labels the input size metric.
+    """
+    result, stats = await run_conversion(run_with_stats, func, *args, on_abandon=on_abandon)
+    _record_conversion(stats, input_bytes, source)
+    return result, stats
+
+
+def _validate_upload_filename(filename: str) -> None:
+    """Reject uploads with a disallowed extension before any data is stored"""
+    if not is_valid_file_extension(filename):
+        log.warning(f"Rejected file with invalid extension: {filename}")
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid file type. Allowed types: {', '.join(config.ALLOWED_EXTENSIONS)}"
+        )
+
+
+def _invalid_filename(filename: str) -> HTTPException:
+    log.warning(f"Rejected invalid filename: {filename!r}")
+    return HTTPException(status_code=400, detail="Invalid filename")
+
+
+async def _stored_size(storage: Storage, area: str, filename: str) -> Optional[int]:
+    """Size of a stored file named by the client, None if it does not exist"""
+    try:
+        return await asyncio.to_thread(storage.size, area, filename)
+    except ValueError:
+        raise _invalid_filename(filename)
+
+
+async def _convert_to_storage(
+    storage: Storage,
+    func: Callable,
+    source: str,
+    output_filename: str,
+    output_path: Path,
+    input_bytes: int,
+    source_label: str
+) -> Dict[str, Any]:
+    """Convert into an allocated output path, store the result and return the stats
+    
+    The output is discarded on failure, and again once a timed out
+    conversion that could not be cancelled has finished writing it.
+    """
+    try:
+        _, stats = await run_instrumented_conversion(
+            func, source, str(output_path),
+            input_bytes=input_bytes, source=source_label,
+            on_abandon=partial(storage.discard, output_path)
+        )
+    except BaseException:
+        storage.discard(output_path)
+        raise
+    await asyncio.to_thread(storage.commit, OUTPUTS, output_filename, output_path)
+    return stats
+
+
+async def upload_file(request: Request) -> dict:
+    """Handle file upload
+    
+    The multipart body is streamed to disk, so the size limit is enforced
+    while receiving and oversized uploads are aborted early.
+    """
+    try:
+        upload = await receive_upload(
+            request,
+            get_storage(),
+            validate_filename=_validate_upload_filename
+        )
         
-        with open(file_path, 'wb') as f:
-            f.write(content)
+        upload_digests.put(upload['filename'], {
+            "contentHash": upload['contentHash'],
+            "originalName": upload['originalName']
+        })
         
-        log.info(f"File uploaded: {file.filename} ({len(content)} bytes)")
+        log_request(f"File uploaded: {upload['originalName']} ({upload['size']} bytes)")
         
         return {
             "success": True,
             "message": "File uploaded successfully",
             "data": {
-                "filename": unique_filename,
-                "originalName": file.filename,
-                "size": len(content),
-                "path": str(file_path)
+                "filename": upload['filename'],
+                "originalName": upload['originalName'],
+                "size": upload['size'],
+                "path": str(upload['path']),
+                "contentHash": upload['contentHash']
             }
         }
     
@@ -71,32 +182,69 @@ async def convert_file(filename: str) -> dict:
             log.warning("Conversion attempt with no filename")
             raise HTTPException(status_code=400, detail="Filename is required")
         
-        input_path = config.UPLOAD_DIR / filename
+        storage = get_storage()
+        input_bytes = await _stored_size(storage, UPLOADS, filename)
         
         # Check if file exists
-        if not input_path.exists():
+        if input_bytes is None:
             log.warning(f"Conversion attempt for non-existent file: {filename}")
             raise HTTPException(status_code=404, detail="File not found")
         
-        log.info(f"Starting conversion for: {filename}")
+        log_request(f"Starting conversion for: {filename}")
+        
+        # Reuse a previous output when the upload's content hash is known
+        cache_key = None
+        upload_info = upload_digests.get(filename)
+        if upload_info:
+            cache_key = result_cache.make_digest_key(
+                upload_info['contentHash'],
+                CONVERTER_VERSION,
+                name=Path(upload_info['originalName']).stem,
+                output='file',
+                template=template_identity()
+            )
+            cached_filename = result_cache.get(cache_key)
+            if cached_filename:
+                log_request(f"Conversion served from cache: {cached_filename}")
+                return {
+                    "success": True,
+                    "message": "File converted successfully",
+                    "data": {
+                        "outputFilename": cached_filename,
+                        "downloadUrl": f"/api/download/{cached_filename}",
+                        "cached": True
+                    }
+                }
         
         # Generate output filename
-        output_filename = generate_unique_filename(
-            Path(filename).stem + '.docx'
-        )
-        output_path = config.OUTPUT_DIR / output_filename
+        output_filename, output_path = storage.allocate(OUTPUTS, Path(filename).stem + '.docx')
         
         # Convert markdown to Word
-        convert_markdown_to_word(str(input_path), str(output_path))
+        try:
+            input_path = await asyncio.to_thread(storage.fetch, UPLOADS, filename)
+        except FileNotFoundError:
+            storage.discard(output_path)
+            log.warning(f"Conversion attempt for non-existent file: {filename}")
+            raise HTTPException(status_code=404, detail="File not found")
+        try:
+            stats = await _convert_to_storage(
+                storage, convert_markdown_to_word, str(input_path),
+                output_filename, output_path, input_bytes, 'convert'
+            )
+        finally:
+            storage.release(input_path)
+        if cache_key:
+            result_cache.put(cache_key, output_filename)
         
-        log.info(f"Conversion completed: {output_filename}")
+        log_request(f"Conversion completed: {output_filename}")
         
         return {
             "success": True,
             "message": "File converted successfully",
             "data": {
                 "outputFilename": output_filename,
-                "downloadUrl": f"/api/download/{output_filename}"
+                "downloadUrl": f"/api/download/{output_filename}",
+                "stats": stats
             }
         }
     
@@ -107,31 +255,100 @@ async def convert_file(filename: str) -> dict:
         raise HTTPException(status_code=500, detail=f"Failed to convert file: {str(e)}")
 
 
-async def convert_content(content: str, filename: Optional[str] = None) -> dict:
-    """Handle direct markdown content conversion"""
+def _server_timing(stats: Dict[str, Any]) -> str:
+    """Format conversion stage durations as a Server-Timing header value"""
+    return ', '.join(f"{name};dur={ms}" for name, ms in stats["durationsMs"].items())
+
+
+def _docx_response(
+    data: bytes,
+    base_name: str,
+    cached: bool = False,
+    stats: Optional[Dict[str, Any]] = None
+) -> Response:
+    """Return DOCX bytes directly as a file download
+    
+    Stage durations of a fresh conversion are sent in a Server-Timing header.
+    """
+    headers = {"Content-Disposition": f'attachment; filename="{sanitize_filename(base_name)}.docx"'}
+    if cached:
+        headers["X-Cache"] = "HIT"
+    if stats:
+        headers["Server-Timing"] = _server_timing(stats)
+    return Response(content=data, media_type=DOCX_MEDIA_TYPE, headers=headers)
+
+
+async def convert_content(content: str, filename: Optional[str] = None, inline: bool = False):
+    """Handle direct markdown content conversion
+    
+    With ``inline`` the DOCX bytes are returned in the response body instead
+    of being written to OUTPUT_DIR for a separate download request.
+    """
     try:
         content_len = len(content) if content else 0
-        log.info(f"Starting direct content conversion (length: {content_len}, filename: {filename})")
+        log_request(f"Starting direct content conversion (length: {content_len}, filename: {filename})")
         
         if not content:
             log.warning("Content conversion attempt with no content")
             raise HTTPException(status_code=400, detail="Content is required")
         
         base_name = Path(filename).stem if filename else 'converted'
-        output_filename = generate_unique_filename(base_name + '.docx')
-        output_path = config.OUTPUT_DIR / output_filename
+        
+        # Reuse a previous output for identical content and options; inline
+        # (bytes) and file entries are stored differently, so keep them apart
+        cache_key = result_cache.make_key(
+            content, CONVERTER_VERSION,
+            name=base_name,
+            output='bytes' if inline else 'file',
+            template=template_identity()
+        )
+        
+        if inline:
+            data = result_cache.get_bytes(cache_key)
+            if data is not None:
+                log_request(f"Inline content conversion served from cache ({len(data)} bytes)")
+                return _docx_response(data, base_name, cached=True)
+            
+            data, stats = await run_instrumented_conversion(
+                convert_markdown_content_to_bytes, content,
+                input_bytes=len(content.encode('utf-8')), source='convert-content'
+            )
+            result_cache.put_bytes(cache_key, data)
+            log_request(f"Inline content conversion completed ({len(data)} bytes)")
+            return _docx_response(data, base_name, stats=stats)
+        
+        cached_filename = result_cache.get(cache_key)
+        if cached_filename:
+            log_request(f"Content conversion served from cache: {cached_filename}")
+            return {
+                "success": True,
+                "message": "Content converted successfully",
+                "data": {
+                    "outputFilename": cached_filename,
+                    "downloadUrl": f"/api/download/{cached_filename}",
+                    "cached": True
+                }
+            }
+        
+        storage = get_storage()
+        output_filename, output_path = storage.allocate(OUTPUTS, base_name + '.docx')
         
         # Convert markdown content to Word
-        convert_markdown_content_to_word(content, str(output_path))
+        stats = await _convert_to_storage(
+            storage, convert_markdown_content_to_word, content,
+            output_filename, output_path, len(content.encode('utf-8')), 'convert-content'
+        )
+        result_cache.put(cache_key, output_filename)
         
-        log.info(f"Content conversion completed: {output_filename}")
+        log_request(f"Content conversion completed: {output_filename}")
         
         return {
             "success": True,
             "message": "Content converted successfully",
             "data": {
                 "outputFilename": output_filename,
-                "downloadUrl": f"/api/download/{output_filename}"
+                "downloadUrl": f"/api/download/{output_filename}",
+                "stats": stats
             }
         }
     
@@ -142,25 +359,327 @@ async def convert_content(content: str, filename: Optional[str] = None) -> dict:
         raise HTTPException(status_code=500, detail=f"Failed to convert content: {str(e)}")
 
 
-async def download_file(filename: str) -> FileResponse:
+def _convert_batch_entry(content: bytes) -> Tuple[bytes, Dict[str, Any]]:
+    """Convert one batch document and return the DOCX bytes and stats (runs on the pool)"""
+    with collect_stats() as stats:
+        data = convert_markdown_content_to_bytes(content.decode('utf-8'))
+    return data, stats.to_dict()
+
+
+async def _read_batch_inputs(files: List[UploadFile]) -> List[tuple]:
+    """Collect (name, data, error) inputs from uploaded files and zip archives"""
+    inputs = []
+    total_size = 0
+    
+    for file in files:
+        if Path(file.filename or '').suffix.lower() == '.zip':
+            try:
+                # Decompressing up to BATCH_MAX_SIZE must not block the event loop
+                entries = await asyncio.to_thread(
+                    read_zip_inputs,
+                    file.file,
+                    max_files=config.BATCH_MAX_FILES - len(inputs),
+                    max_total_size=config.BATCH_MAX_SIZE - total_size
+                )
+            except (zipfile.BadZipFile, ValueError) as e:
+                raise HTTPException(status_code=400, detail=f"Invalid archive {file.filename}: {e}")
+            inputs.extend(entries)
+            total_size += sum(len(data) for _, data, _ in entries)
+            continue
+        
+        if len(inputs) >= config.BATCH_MAX_FILES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Too many files. Maximum is {config.BATCH_MAX_FILES}"
+            )
+        if not is_valid_file_extension(file.filename or ''):
+            inputs.append((file.filename, b'', 'Unsupported file type'))
+            continue
+        
+        data = await file.read(config.MAX_FILE_SIZE + 1)
+        if len(data) > config.MAX_FILE_SIZE:
+            inputs.append((file.filename, b'', 'File too large'))
+            continue
+        
+        total_size += len(data)
+        if total_size > config.BATCH_MAX_SIZE:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Batch too large. Maximum total size is {config.BATCH_MAX_SIZE / 1024 / 1024}MB"
+            )
+        inputs.append((file.filename, data, ''))
+    
+    return inputs
+
+
+async def convert_batch(files: List[UploadFile]) -> StreamingResponse:
+    """Handle conversion of many documents in one request
+    
+    Accepts Markdown files and/or zip archives of Markdown files. Documents
+    are converted in parallel on the worker pool and streamed back as one
+    zip, entry by entry as conversions finish, followed by a manifest.json
+    with the status of every input.
+    """
+    try:
+        if not files:
+            log.warning("Batch conversion attempt with no files")
+            raise HTTPException(status_code=400, detail="No files uploaded")
+        
+        inputs = await _read_batch_inputs(files)
+        if not inputs:
+            raise HTTPException(status_code=400, detail="No files uploaded")
+        
+        log_request(f"Starting batch conversion of {len(inputs)} files")
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        log.error(f"Error in convert_batch: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to convert batch: {str(e)}")
+    
+    pool = get_conversion_pool()
+    # Leave queue slots for other requests instead of flooding the pool
+    limit = asyncio.Semaphore(pool.workers)
+    used_names = set()
+    
+    def output_name(name: str) -> str:
+        stem = Path(name).stem or 'converted'
+        candidate = f"{stem}.docx"
+        n = 1
+        while candidate in used_names:
+            candidate = f"{stem}_{n}.docx"
+            n += 1
+        used_names.add(candidate)
+        return candidate
+    
+    async def run_entry(data: bytes) -> tuple:
+        # Other requests may hold every queue slot for a moment; wait for one
+        # to free up rather than failing the entry
+        while True:
+            try:
+                return await pool.run(
+                    _convert_batch_entry, data,
+                    timeout=config.CONVERSION_TIMEOUT_SECONDS
+                )
+            except PoolFullError:
+                await asyncio.sleep(BATCH_RETRY_SECONDS)
+    
+    async def convert_one(index: int, name: str, data: bytes) -> tuple:
+        async with limit:
+            try:
+                result, stats = await run_entry(data)
+                _record_conversion(stats, len(data), 'convert-batch')
+                manifest[index]["stats"] = stats
+                return index, result, ''
+            except asyncio.TimeoutError:
+                return index, None, 'Conversion timed out'
+            except UnicodeDecodeError:
+                return index, None, 'File is not valid UTF-8'
+            except Exception as e:
+                log.error(f"Batch conversion failed for {name}: {e}")
+                return index, None, 'Conversion failed'
+    
+    manifest = []
+    tasks = []
+    for index, (name, data, error) in enumerate(inputs):
+        manifest.append({
+            "name": name,
+            "output": None,
+            "status": "failed" if error else "pending",
+            "error": error or None
+        })
+        if not error:
+            tasks.append(asyncio.ensure_future(convert_one(index, name, data)))
+    
+    async def stream():
+        writer = StreamingZipWriter()
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, result, error = await next_done
+                entry = manifest[index]
+                if error:
+                    entry["status"] = "failed"
+                    entry["error"] = error
+                    continue
+                entry["status"] = "done"
+                entry["output"] = output_name(entry["name"])
+                # DOCX files are already deflated, store them as they are
+                await asyncio.to_thread(writer.add, entry["output"], result, zipfile.ZIP_STORED)
+                yield writer.drain()
+            
+            writer.add('manifest.json', json.dumps({"files": manifest}, indent=2, ensure_ascii=False))
+            yield writer.close()
+            done = sum(1 for entry in manifest if entry["status"] == "done")
+            log_request(f"Batch conversion completed: {done}/{len(manifest)} files converted")
+        finally:
+            # Client went away or streaming failed: drop conversions not yet started
+            for task in tasks:
+                task.cancel()
+    
+    return StreamingResponse(
+        stream(),
+        media_type='application/zip',
+        headers={"Content-Disposition": 'attachment; filename="converted.zip"'}
+    )
+
+
+async def submit_job(
+    filename: Optional[str] = None,
+    content: Optional[str] = None,
+    name: Optional[str] = None
+) -> dict:
+    """Submit an asynchronous conversion job and return its id immediately
+    
+    Converts either a previously uploaded file (``filename``) or Markdown
+    ``content``. Progress and the result are reported by ``get_job``.
+    """
+    try:
+        storage = get_storage()
+        if filename:
+            input_bytes = await _stored_size(storage, UPLOADS, filename)
+            if input_bytes is None:
+                log.warning(f"Job submitted for non-existent file: {filename}")
+                raise HTTPException(status_code=404, detail="File not found")
+            func, content = convert_markdown_to_word, None
+            base_name = Path(filename).stem
+        elif content:
+            func, filename = convert_markdown_content_to_word, None
+            input_bytes = len(content.encode('utf-8'))
+            base_name = Path(name).stem if name else 'converted'
+        else:
+            log.warning("Job submitted with neither filename nor content")
+            raise HTTPException(status_code=400, detail="Filename or content is required")
+        
+        output_filename, output_path = storage.allocate(OUTPUTS, base_name + '.docx')
+        job = job_store.create(output_filename)
+        
+        # Token progress can only be reported from threads sharing our memory
+        pool = get_conversion_pool()
+        progress = job.update_progress if pool.kind == 'thread' else None
+        
+        try:
+            job.future = pool.submit(
+                run_stored_job, func, filename, content, output_filename, str(output_path), progress
+            )
+        except PoolFullError as e:
+            job_store.remove(job.id)
+            storage.discard(output_path)
+            log.warning(f"Rejected job: {e}")
+            raise HTTPException(
+                status_code=503,
+                detail="Server is busy, please retry shortly",
+                headers={"Retry-After": "5"}
+            )
+        job.future.add_done_callback(job.finish)
+        job.future.add_done_callback(partial(_record_job_stats, input_bytes))
+        
+        log_request(f"Job {job.id} queued: {output_filename}")
+        
+        return {
+            "success": True,
+            "message": "Conversion job submitted",
+            "data": {
+                "jobId": job.id,
+                "statusUrl": f"/api/jobs/{job.id}"
+            }
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        log.error(f"Error in submit_job: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to submit job: {str(e)}")
+
+
+def run_stored_job(
+    func: Callable,
+    filename: Optional[str],
+    content: Optional[str],
+    output_filename: str,
+    output_path: str,
+    progress=None
+) -> Tuple[Any, Dict[str, Any]]:
+    """Job body run on the worker pool: fetch the upload, convert and store the output
+
+    Returns ``(result, stats dict)`` like run_with_stats. Module level so
+    it can be sent to process pool workers, which use their own storage.
+    """
+    storage = get_storage()
+    try:
+        if filename:
+            with storage.local_copy(UPLOADS, filename) as input_path:
+                result = run_with_stats(func, str(input_path), output_path, progress)
+        else:
+            result = run_with_stats(func, content, output_path, progress)
+    except BaseException:
+        storage.discard(Path(output_path))
+        raise
+    storage.commit(OUTPUTS, output_filename, Path(output_path))
+    return result
+
+
+def _record_job_stats(input_bytes: int, future) -> None:
+    """Done callback adding a finished job's stats to the aggregates"""
+    if not future.cancelled() and future.exception() is None:
+        _record_conversion(future.result()[1], input_bytes, 'jobs')
+
+
+async def get_job(job_id: str) -> dict:
+    """Report the status, progress and result of a conversion job"""
+    job = job_store.get(job_id)
+    if job is None:
+        log.warning(f"Status requested for unknown job: {job_id}")
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return {
+        "success": True,
+        "data": job.to_dict()
+    }
+
+
+def _iter_stream(stream, chunk_size: int = 64 * 1024):
+    """Yield a binary stream in chunks and close it"""
+    try:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        stream.close()
+
+
+async def download_file(filename: str) -> Response:
     """Handle file download"""
     try:
         if not filename:
             log.warning("Download attempt with no filename")
             raise HTTPException(status_code=400, detail="Filename is required")
         
-        file_path = config.OUTPUT_DIR / filename
-        
-        # Check if file exists
-        if not file_path.exists():
+        storage = get_storage()
+        try:
+            file_path = storage.local_path(OUTPUTS, filename)
+            if file_path is None:
+                stream = await asyncio.to_thread(storage.open, OUTPUTS, filename)
+            elif not file_path.exists():
+                raise FileNotFoundError(filename)
+        except ValueError:
+            raise _invalid_filename(filename)
+        except FileNotFoundError:
             log.warning(f"Download attempt for non-existent file: {filename}")
             raise HTTPException(status_code=404, detail="File not found")
         
-        log.info(f"Downloading file: {filename}")
+        log_request(f"Downloading file: {filename}")
         
+        if file_path is None:
+            return StreamingResponse(
+                _iter_stream(stream),
+                media_type=DOCX_MEDIA_TYPE,
+                headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+            )
         return FileResponse(
             path=str(file_path),
-            media_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+            media_type=DOCX_MEDIA_TYPE,
             filename=filename
         )
     
@@ -171,6 +690,64 @@ async def download_file(filename: str) -> FileResponse:
         raise HTTPException(status_code=500, detail=f"Failed to download file: {str(e)}")
 
 
+async def get_stats() -> dict:
+    """Aggregated conversion stage timings, counts and cache statistics"""
+    return {
+        "success": True,
+        "data": {
+            **conversion_stats.snapshot(),
+            "formulaCache": get_formula_cache_stats(),
+            "formulaStore": get_formula_store_stats(),
+            "blockCache": get_block_cache_stats()
+        }
+    }
+
+
+def _cache_samples(field: str):
+    """Samples of one LRU cache statistic for every converter cache"""
+    def collect():
+        for name, stats in (
+            ('formula', get_formula_cache_stats()),
+            ('block', get_block_cache_stats()),
+            ('result', result_cache.stats())
+        ):
+            yield {"cache": name}, stats[field]
+    return collect
+
+
+def _register_metrics() -> None:
+    """Register gauges read from the caches, worker pool and (filesystem storage) output directory at scrape time"""
+    def pool_value(attribute: str):
+        return lambda: [({}, getattr(get_conversion_pool(), attribute))]
+    
+    metrics_registry.counter('mdlatex2word_cache_hits_total', 'Cache lookups that found an entry', _cache_samples('hits'))
+    metrics_registry.counter('mdlatex2word_cache_misses_total', 'Cache lookups that found no entry', _cache_samples('misses'))
+    metrics_registry.gauge('mdlatex2word_cache_hit_ratio', 'Share of cache lookups that found an entry', _cache_samples('hitRate'))
+    metrics_registry.gauge('mdlatex2word_cache_entries', 'Number of cached entries', _cache_samples('entries'))
+    metrics_registry.gauge('mdlatex2word_conversion_queue_depth', 'Admitted conversions waiting for a worker', pool_value('queue_depth'))
+    metrics_registry.gauge('mdlatex2word_conversion_pending', 'Admitted conversions, running or waiting', pool_value('pending'))
+    metrics_registry.gauge('mdlatex2word_conversion_capacity', 'Maximum admitted conversions before rejecting with 503', pool_value('capacity'))
+    
+    # With S3 storage the output directory only holds transient staging files
+    if config.STORAGE_BACKEND == 'filesystem':
+        output_size = DirectorySize(config.OUTPUT_DIR)
+        metrics_registry.gauge('mdlatex2word_output_directory_bytes', 'Total size of files in the output directory', lambda: [({}, output_size.get()[0])])
+        metrics_registry.gauge('mdlatex2word_output_directory_files', 'Number of files in the output directory', lambda: [({}, output_size.get()[1])])
+
+
+_register_metrics()
+
+
+async def get_metrics() -> Response:
+    """Prometheus text exposition of all metrics
+    
+    Rendered in a thread: the output directory gauges may rescan the
+    directory tree, which must not block the event loop.
+    """
+    content = await asyncio.to_thread(metrics_registry.render)
+    return Response(content=content, media_type=PROMETHEUS_MEDIA_TYPE)
+
+
 async def health_check() -> dict:
     """Health check endpoint"""
     from datetime import datetime
@@ -1,12 +1,28 @@
 """Models package for mdLaTeX2Word"""
 from .converter import (
+    CONVERTER_VERSION,
     convert_markdown_to_word,
     convert_markdown_content_to_word,
-    parse_markdown
+    convert_markdown_content_to_bytes,
+    get_block_cache_stats,
+    get_formula_cache_stats,
+    get_formula_store_stats,
+    get_markdown_parser,
+    parse_markdown,
+    warm_formula_cache
 )
+from .streaming import convert_markdown_file_streaming
 
 __all__ = [
+    'CONVERTER_VERSION',
     'convert_markdown_to_word',
     'convert_markdown_content_to_word',
-    'parse_markdown'
+    'convert_markdown_content_to_bytes',
+    'convert_markdown_file_streaming',
+    'get_block_cache_stats',
+    'get_formula_cache_stats',
+    'get_formula_store_stats',
+    'get_markdown_parser',
+    'parse_markdown',
+    'warm_formula_cache'
 ]
@@ -2,30 +2,144 @@
 Markdown to DOCX converter with LaTeX formula support
 """
 from pathlib import Path
-from typing import List, Dict, Any, Tuple, Optional
+from typing import List, Dict, Any, Tuple, Optional, Callable
+import copy
+import hashlib
+import html
+import importlib.metadata
+import os
 import re
+import threading
+import time
+from concurrent.futures import BrokenExecutor
 from io import BytesIO
 
 from docx import Document
 from docx.shared import Pt, Inches, RGBColor
+from docx.enum.style import WD_STYLE_TYPE
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
 from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_LINE_SPACING
-from docx.oxml import OxmlElement
-from docx.oxml.ns import qn
+from docx.oxml import OxmlElement, parse_xml
+from docx.oxml.ns import nsmap, qn
+from docx.text.paragraph import Paragraph
 from markdown_it import MarkdownIt
 from mdit_py_plugins.texmath import texmath_plugin
 from latex2mathml.converter import convert as latex_to_mathml
+from latex2mathml.converter import convert_to_element as latex_to_mathml_tree
 from lxml import etree
 
+import config
 from utils import log
+from utils.cache import LRUCache
+from utils.workers import get_formula_pool, shutdown_formula_pool
+from models.formula_store import FormulaStore
+from models.latex_normalizer import normalize_latex
+from models.stats import current_stats, stage
+from models.templates import new_document
+
+
+# Bump when converter output changes so cached results are invalidated
+CONVERTER_VERSION = '1.2.0'
+
+# Process-wide cache of rendered formulas: latex -> OMML template.
+# Failed conversions are cached as None so they are not retried.
+_formula_cache = LRUCache(config.FORMULA_CACHE_SIZE)
+_MISSING = object()
+
+def _build_abstract_num(is_ordered: bool) -> OxmlElement:
+    """Build a 9-level numbering definition for ordered or bullet lists"""
+    abstractNum = OxmlElement('w:abstractNum')
+    
+    # Add basic multi-level support (Word expects 9 levels)
+    for level in range(9):
+        lvl = OxmlElement('w:lvl')
+        lvl.set(qn('w:ilvl'), str(level))
+        
+        start = OxmlElement('w:start')
+        start.set(qn('w:val'), '1')
+        lvl.append(start)
+        
+        numFmt = OxmlElement('w:numFmt')
+        if is_ordered:
+            numFmt.set(qn('w:val'), 'decimal')
+        else:
+            numFmt.set(qn('w:val'), 'bullet')
+        lvl.append(numFmt)
+        
+        lvlText = OxmlElement('w:lvlText')
+        if is_ordered:
+            # Use standard %1. format for level 0
+            text = f"%{level + 1}."
+            lvlText.set(qn('w:val'), text)
+        else:
+            lvlText.set(qn('w:val'), '•')
+        lvl.append(lvlText)
+        
+        lvlJc = OxmlElement('w:lvlJc')
+        lvlJc.set(qn('w:val'), 'left')
+        lvl.append(lvlJc)
+        
+        # Indentation
+        pPr = OxmlElement('w:pPr')
+        ind = OxmlElement('w:ind')
+        # 360 twips (0.25 inch) per level increment
+        left = 720 + (level * 360) 
+        hanging = 360
+        ind.set(qn('w:left'), str(left))
+        ind.set(qn('w:hanging'), str(hanging))
+        pPr.append(ind)
+        lvl.append(pPr)
+        
+        abstractNum.append(lvl)
+    
+    return abstractNum
+
+
+def _build_num(level: int) -> OxmlElement:
+    """Build a numbering instance restarting ``level`` at 1"""
+    num = OxmlElement('w:num')
+    num.append(OxmlElement('w:abstractNumId'))
+    
+    lvlOverride = OxmlElement('w:lvlOverride')
+    lvlOverride.set(qn('w:ilvl'), str(level))
+    startOverride = OxmlElement('w:startOverride')
+    startOverride.set(qn('w:val'), '1')
+    lvlOverride.append(startOverride)
+    num.append(lvlOverride)
+    
+    return num
+
+
+# Element templates shared by all documents: abstractNum per list type and
+# num per list level
+_ABSTRACT_NUM_TEMPLATES = {True: _build_abstract_num(True), False: _build_abstract_num(False)}
+_NUM_TEMPLATES = [_build_num(level) for level in range(9)]
 
 
 class ListManager:
-    """Manages list numbering for Word documents"""
+    """Manages list numbering for Word documents
+    
+    All ordered lists share one abstractNum and all bullet lists another;
+    every list gets its own w:num that restarts its level with a
+    lvlOverride/startOverride, so numbering.xml grows by one small element
+    per list.
+    """
     
     def __init__(self, doc: Document):
         self.doc = doc
         self.list_count = 0
         self._ensure_numbering()
+        
+        # Access the underlying XML
+        self._numbering = self.doc.part.numbering_part.numbering_definitions._numbering
+        
+        # Continue after ids already used by the template
+        abstract_ids = [int(a.get(qn('w:abstractNumId'))) for a in self._numbering.iterchildren(qn('w:abstractNum'))]
+        num_ids = [int(n.get(qn('w:numId'))) for n in self._numbering.iterchildren(qn('w:num'))]
+        self._next_abstract_id = max(abstract_ids, default=-1) + 1
+        self._num_id_offset = max(num_ids + [100])  # Offset to avoid conflict
+        self._abstract_ids: Dict[bool, str] = {}
+        self._style_ids: Dict[bool, Optional[str]] = {}
     
     def _ensure_numbering(self):
         """Ensure the document has numbering part and basic abstract definitions"""
@@ -35,80 +149,48 @@ class ListManager:
             self.doc.part.numbering_part
         except Exception:
             pass
-
-    def get_new_num_id(self, is_ordered: bool = True) -> int:
-        """Create a new numbering definition and return its numId"""
-        self.list_count += 1
-        
-        # Access the underlying XML
-        numbering = self.doc.part.numbering_part.numbering_definitions._numbering
-        
-        # 1. Create a new abstractNum
-        abstract_num_id = self.list_count
-        abstractNum = OxmlElement('w:abstractNum')
-        abstractNum.set(qn('w:abstractNumId'), str(abstract_num_id))
-        
-        # Add basic multi-level support (Word expects 9 levels)
-        for level in range(9):
-            lvl = OxmlElement('w:lvl')
-            lvl.set(qn('w:ilvl'), str(level))
-            
-            start = OxmlElement('w:start')
-            start.set(qn('w:val'), '1')
-            lvl.append(start)
+    
+    def _abstract_num_id(self, is_ordered: bool) -> str:
+        """Return the shared abstractNumId for a list type, creating it on first use"""
+        abstract_id = self._abstract_ids.get(is_ordered)
+        if abstract_id is None:
+            abstract_id = str(self._next_abstract_id)
+            self._next_abstract_id += 1
+            self._abstract_ids[is_ordered] = abstract_id
             
-            numFmt = OxmlElement('w:numFmt')
-            if is_ordered:
-                numFmt.set(qn('w:val'), 'decimal')
-            else:
-                numFmt.set(qn('w:val'), 'bullet')
-            lvl.append(numFmt)
+            abstractNum = copy.deepcopy(_ABSTRACT_NUM_TEMPLATES[is_ordered])
+            abstractNum.set(qn('w:abstractNumId'), abstract_id)
             
-            lvlText = OxmlElement('w:lvlText')
-            if is_ordered:
-                # Use standard %1. format for level 0
-                text = f"%{level + 1}."
-                lvlText.set(qn('w:val'), text)
+            # Insert abstractNum into numbering.xml (must be before 'num' elements)
+            first_num = self._numbering.find(qn('w:num'))
+            if first_num is not None:
+                first_num.addprevious(abstractNum)
             else:
-                lvlText.set(qn('w:val'), '•')
-            lvl.append(lvlText)
-            
-            lvlJc = OxmlElement('w:lvlJc')
-            lvlJc.set(qn('w:val'), 'left')
-            lvl.append(lvlJc)
-            
-            # Indentation
-            pPr = OxmlElement('w:pPr')
-            ind = OxmlElement('w:ind')
-            # 360 twips (0.25 inch) per level increment
-            left = 720 + (level * 360) 
-            hanging = 360
-            ind.set(qn('w:left'), str(left))
-            ind.set(qn('w:hanging'), str(hanging))
-            pPr.append(ind)
-            lvl.append(pPr)
-            
-            abstractNum.append(lvl)
-        
-        # Insert abstractNum into numbering.xml (must be before 'num' elements)
-        # Find the first 'num' element or end of list
-        nums = numbering.xpath('w:num')
-        if nums:
-            nums[0].addprevious(abstractNum)
-        else:
-            numbering.append(abstractNum)
-            
-        # 2. Create a new num (instance) that points to the abstractNum
-        num = OxmlElement('w:num')
-        num.set(qn('w:numId'), str(self.list_count + 100)) # Offset to avoid conflict
+                self._numbering.append(abstractNum)
+        return abstract_id
+    
+    def apply_list_style(self, paragraph, is_ordered: bool) -> None:
+        """Set the 'List Number' or 'List Bullet' style on a paragraph
         
-        abstractNumId = OxmlElement('w:abstractNumId')
-        abstractNumId.set(qn('w:val'), str(abstract_num_id))
-        num.append(abstractNumId)
+        Resolving a style name scans every style in the document, so the
+        style id is looked up once per list type.
+        """
+        if is_ordered not in self._style_ids:
+            name = 'List Number' if is_ordered else 'List Bullet'
+            self._style_ids[is_ordered] = self.doc.part.get_style_id(name, WD_STYLE_TYPE.PARAGRAPH)
+        paragraph._p.style = self._style_ids[is_ordered]
+    
+    def get_new_num_id(self, is_ordered: bool = True, level: int = 0) -> int:
+        """Create a numbering instance restarting at ``level`` and return its numId"""
+        self.list_count += 1
+        num_id = self.list_count + self._num_id_offset
         
-        numbering.append(num)
+        num = copy.deepcopy(_NUM_TEMPLATES[min(level, 8)])
+        num.set(qn('w:numId'), str(num_id))
+        num[0].set(qn('w:val'), self._abstract_num_id(is_ordered))
+        self._numbering.append(num)
         
-        return self.list_count + 100
+        return num_id
 
     @staticmethod
     def set_paragraph_numbering(paragraph, num_id: int, level: int = 0):
@@ -182,275 +264,257 @@ def mathml_to_omml(mathml_str: str) -> Optional[OxmlElement]:
             # Try a more lenient parse if possible or just fail gracefully
             return None
         
+        return mathml_tree_to_omml(mathml)
+    
+    except Exception as e:
+        log.error(f"Error converting MathML to OMML: {e}")
+        return None
+
+
+# MathML namespace as it appears in parsed MathML strings; trees built by
+# latex2mathml use bare tag names
+MATHML_NS = '{http://www.w3.org/1998/Math/MathML}'
+
+
+def _omml_template(tag: str, *children: str) -> OxmlElement:
+    """Build an OMML element with empty child elements, in order"""
+    elem = OxmlElement(tag)
+    for child in children:
+        elem.append(OxmlElement(child))
+    return elem
+
+
+def _run_template(style: str) -> OxmlElement:
+    """Build an ``m:r`` with ``m:rPr/m:sty`` set to ``style`` and an empty ``m:t``"""
+    r = OxmlElement('m:r')
+    rPr = OxmlElement('m:rPr')
+    sty = OxmlElement('m:sty')
+    sty.set(qn('m:val'), style)
+    rPr.append(sty)
+    r.append(rPr)
+    r.append(OxmlElement('m:t'))
+    return r
+
+
+def _sqrt_template() -> OxmlElement:
+    """Build an ``m:rad`` with the degree hidden"""
+    rad = _omml_template('m:rad', 'm:radPr', 'm:e')
+    degHide = OxmlElement('m:degHide')
+    degHide.set(qn('m:val'), '1')
+    rad[0].append(degHide)
+    return rad
+
+
+# Prebuilt OMML skeletons, deep-copied for every MathML node instead of
+# being assembled element by element
+_OMML_TEMPLATES = {
+    'run-p': _run_template('p'),   # plain: numbers, operators, text
+    'run-i': _run_template('i'),   # italic: identifiers
+    'e': OxmlElement('m:e'),
+    'f': _omml_template('m:f', 'm:num', 'm:den'),
+    'sSup': _omml_template('m:sSup', 'm:e', 'm:sup'),
+    'sSub': _omml_template('m:sSub', 'm:e', 'm:sub'),
+    'sSubSup': _omml_template('m:sSubSup', 'm:e', 'm:sub', 'm:sup'),
+    'sqrt': _sqrt_template(),
+    'root': _omml_template('m:rad', 'm:deg', 'm:e'),
+    'func': _omml_template('m:func', 'm:fName', 'm:e'),
+    'acc': _omml_template('m:acc', 'm:accPr', 'm:e'),
+    'chr': OxmlElement('m:chr'),
+    'limUpp': _omml_template('m:limUpp', 'm:lim'),
+    'limLow': _omml_template('m:limLow', 'm:e', 'm:lim'),
+    'd': _omml_template('m:d', 'm:dPr', 'm:e'),
+    'delimiters': _omml_template('m:dPr', 'm:begChr', 'm:endChr'),
+    'm': OxmlElement('m:m'),
+    'mr': OxmlElement('m:mr'),
+}
+
+_XML_SPACE = qn('xml:space')
+_M_VAL = qn('m:val')
+
+
+def _new_omml(name: str) -> OxmlElement:
+    return copy.deepcopy(_OMML_TEMPLATES[name])
+
+
+def _mathml_text(text: Optional[str], decode_entities: bool) -> str:
+    """Element text or attribute value, decoded if required"""
+    if not text:
+        return ''
+    if decode_entities and '&' in text:
+        return html.unescape(text)
+    return text
+
+
+def _omml_run(text: str, style: str = 'p') -> OxmlElement:
+    """Create an OMML run element with text and style
+
+    Args:
+        text: The text content
+        style: 'i' for italic (variables), 'p' for plain (operators, numbers)
+    """
+    r = _new_omml('run-i' if style == 'i' else 'run-p')
+    t = r[1]
+    t.text = text or ''
+    # Preserve spaces
+    if text and (text[0] == ' ' or text[-1] == ' '):
+        t.set(_XML_SPACE, 'preserve')
+    return r
+
+
+def _convert_mathml(elem, parent_omml, decode_entities: bool) -> None:
+    """Recursively convert a MathML element into ``parent_omml``"""
+    handler = _MATHML_HANDLERS.get(elem.tag)
+    if handler is None:
+        # Default (mrow, math, unknown tags): process children
+        for child in elem:
+            _convert_mathml(child, parent_omml, decode_entities)
+    else:
+        handler(elem, parent_omml, decode_entities)
+
+
+def _convert_mathml_into(children, target, decode_entities: bool) -> None:
+    for child in children:
+        _convert_mathml(child, target, decode_entities)
+
+
+def _mathml_plain(elem, parent_omml, decode_entities):
+    # Numbers, operators and text - plain style
+    parent_omml.append(_omml_run(_mathml_text(elem.text, decode_entities), 'p'))
+
+
+def _mathml_identifier(elem, parent_omml, decode_entities):
+    # Identifier (variable) - italic style
+    parent_omml.append(_omml_run(_mathml_text(elem.text, decode_entities), 'i'))
+
+
+def _mathml_space(elem, parent_omml, decode_entities):
+    parent_omml.append(_omml_run(' ', 'p'))
+
+
+def _mathml_scripts(template: str, arity: int):
+    """Handler for elements whose first ``arity`` children fill the template's slots in order"""
+    def handler(elem, parent_omml, decode_entities):
+        omml = _new_omml(template)
+        children = list(elem)
+        if len(children) >= arity:
+            for child, slot in zip(children, omml):
+                _convert_mathml(child, slot, decode_entities)
+        parent_omml.append(omml)
+    return handler
+
+
+def _mathml_sqrt(elem, parent_omml, decode_entities):
+    rad = _new_omml('sqrt')
+    _convert_mathml_into(elem, rad[1], decode_entities)
+    parent_omml.append(rad)
+
+
+def _mathml_root(elem, parent_omml, decode_entities):
+    # Nth root: base first, degree second in MathML; degree first in OMML
+    rad = _new_omml('root')
+    children = list(elem)
+    if len(children) >= 2:
+        _convert_mathml(children[0], rad[1], decode_entities)
+        _convert_mathml(children[1], rad[0], decode_entities)
+    parent_omml.append(rad)
+
+
+def _mathml_over(elem, parent_omml, decode_entities):
+    # Overscript (like accent); the second child is the accent character
+    acc = _new_omml('acc')
+    children = list(elem)
+    if len(children) >= 2:
+        _convert_mathml(children[0], acc[1], decode_entities)
+        if children[1].text:
+            chrElem = _new_omml('chr')
+            chrElem.set(_M_VAL, _mathml_text(children[1].text, decode_entities))
+            acc[0].append(chrElem)
+    parent_omml.append(acc)
+
+
+def _mathml_underover(elem, parent_omml, decode_entities):
+    # Under and over script (like limits): lower limit nested in the upper one
+    children = list(elem)
+    if len(children) < 3:
+        _convert_mathml_into(children, parent_omml, decode_entities)
+        return
+
+    limLow = _new_omml('limLow')
+    _convert_mathml(children[0], limLow[0], decode_entities)
+    _convert_mathml(children[1], limLow[1], decode_entities)
+
+    limUpp = _new_omml('limUpp')
+    limUpp.insert(0, limLow)
+    _convert_mathml(children[2], limUpp[1], decode_entities)
+    parent_omml.append(limUpp)
+
+
+def _mathml_fenced(elem, parent_omml, decode_entities):
+    # Fenced expression (parentheses, brackets, etc.)
+    d = _new_omml('d')
+    dPr = _new_omml('delimiters')
+    dPr[0].set(_M_VAL, _mathml_text(elem.get('open', '('), decode_entities))
+    dPr[1].set(_M_VAL, _mathml_text(elem.get('close', ')'), decode_entities))
+    d.replace(d[0], dPr)
+
+    _convert_mathml_into(elem, d[1], decode_entities)
+    parent_omml.append(d)
+
+
+_MTR_TAGS = frozenset(('mtr', MATHML_NS + 'mtr'))
+_MTD_TAGS = frozenset(('mtd', MATHML_NS + 'mtd'))
+
+
+def _mathml_table(elem, parent_omml, decode_entities):
+    # Matrix/Table
+    matrix = _new_omml('m')
+    for row_elem in elem:
+        if row_elem.tag in _MTR_TAGS:
+            mr = _new_omml('mr')
+            for cell_elem in row_elem:
+                if cell_elem.tag in _MTD_TAGS:
+                    e = _new_omml('e')
+                    _convert_mathml_into(cell_elem, e, decode_entities)
+                    mr.append(e)
+            matrix.append(mr)
+    parent_omml.append(matrix)
+
+
+# MathML tag -> handler(elem, parent_omml, decode_entities); tags not listed
+# have their children converted in place
+_MATHML_HANDLERS = {
+    'mn': _mathml_plain,
+    'mi': _mathml_identifier,
+    'mo': _mathml_plain,
+    'mtext': _mathml_plain,
+    'mspace': _mathml_space,
+    'mfrac': _mathml_scripts('f', 2),
+    'msup': _mathml_scripts('sSup', 2),
+    'msub': _mathml_scripts('sSub', 2),
+    'msubsup': _mathml_scripts('sSubSup', 3),
+    'msqrt': _mathml_sqrt,
+    'mroot': _mathml_root,
+    'munder': _mathml_scripts('func', 2),
+    'mover': _mathml_over,
+    'munderover': _mathml_underover,
+    'mfenced': _mathml_fenced,
+    'mtable': _mathml_table,
+}
+_MATHML_HANDLERS.update({MATHML_NS + tag: handler for tag, handler in list(_MATHML_HANDLERS.items())})
+
+
+def mathml_tree_to_omml(mathml, decode_entities: bool = False) -> Optional[OxmlElement]:
+    """
+    Convert a MathML element tree (lxml or xml.etree) to OMML
+    
+    With ``decode_entities`` character references left in text by
+    latex2mathml (e.g. ``&#x003B1;``) are decoded, which is what its string
+    output relies on the XML parser to do.
+    """
+    try:
         # Create OMML root element with proper namespace
         omml = OxmlElement('m:oMath')
-        # Note: Don't set xmlns:m here as it's already defined in the qn() calls
-        
-        def create_run(text: str, style: str = 'p') -> OxmlElement:
-            """Create an OMML run element with text and style
-            
-            Args:
-                text: The text content
-                style: 'i' for italic (variables), 'p' for plain (operators, numbers)
-            """
-            r = OxmlElement('m:r')
-            
-            # Add run properties with style
-            rPr = OxmlElement('m:rPr')
-            sty = OxmlElement('m:sty')
-            sty.set(qn('m:val'), style)
-            rPr.append(sty)
-            r.append(rPr)
-            
-            # Add text
-            t = OxmlElement('m:t')
-            t.text = text or ''
-            # Preserve spaces
-            if text and (text.startswith(' ') or text.endswith(' ')):
-                t.set(qn('xml:space'), 'preserve')
-            r.append(t)
-            
-            return r
-        
-        def convert_element(elem, parent_omml):
-            """Recursively convert MathML elements to OMML"""
-            tag = elem.tag.split('}')[-1] if '}' in elem.tag else elem.tag
-            
-            if tag == 'mn':
-                # Number - plain style
-                parent_omml.append(create_run(elem.text or '', 'p'))
-            
-            elif tag == 'mi':
-                # Identifier (variable) - italic style
-                parent_omml.append(create_run(elem.text or '', 'i'))
-            
-            elif tag == 'mo':
-                # Operator - plain style
-                parent_omml.append(create_run(elem.text or '', 'p'))
-            
-            elif tag == 'mtext':
-                # Text in math - plain style
-                parent_omml.append(create_run(elem.text or '', 'p'))
-            
-            elif tag == 'mspace':
-                # Space - plain style
-                parent_omml.append(create_run(' ', 'p'))
-            
-            elif tag == 'mfrac':
-                # Fraction
-                frac = OxmlElement('m:f')
-                num = OxmlElement('m:num')
-                den = OxmlElement('m:den')
-                
-                children = list(elem)
-                if len(children) >= 2:
-                    convert_element(children[0], num)
-                    convert_element(children[1], den)
-                
-                frac.append(num)
-                frac.append(den)
-                parent_omml.append(frac)
-            
-            elif tag == 'msup':
-                # Superscript
-                sup = OxmlElement('m:sSup')
-                base = OxmlElement('m:e')
-                supElem = OxmlElement('m:sup')
-                
-                children = list(elem)
-                if len(children) >= 2:
-                    convert_element(children[0], base)
-                    convert_element(children[1], supElem)
-                
-                sup.append(base)
-                sup.append(supElem)
-                parent_omml.append(sup)
-            
-            elif tag == 'msub':
-                # Subscript
-                sub = OxmlElement('m:sSub')
-                base = OxmlElement('m:e')
-                subElem = OxmlElement('m:sub')
-                
-                children = list(elem)
-                if len(children) >= 2:
-                    convert_element(children[0], base)
-                    convert_element(children[1], subElem)
-                
-                sub.append(base)
-                sub.append(subElem)
-                parent_omml.append(sub)
-            
-            elif tag == 'msubsup':
-                # Subscript and superscript
-                sSubSup = OxmlElement('m:sSubSup')
-                base = OxmlElement('m:e')
-                subElem = OxmlElement('m:sub')
-                supElem = OxmlElement('m:sup')
-                
-                children = list(elem)
-                if len(children) >= 3:
-                    convert_element(children[0], base)
-                    convert_element(children[1], subElem)
-                    convert_element(children[2], supElem)
-                
-                sSubSup.append(base)
-                sSubSup.append(subElem)
-                sSubSup.append(supElem)
-                parent_omml.append(sSubSup)
-            
-            elif tag == 'msqrt':
-                # Square root
-                rad = OxmlElement('m:rad')
-                radPr = OxmlElement('m:radPr')
-                degHide = OxmlElement('m:degHide')
-                degHide.set(qn('m:val'), '1')
-                radPr.append(degHide)
-                
-                base = OxmlElement('m:e')
-                for child in elem:
-                    convert_element(child, base)
-                
-                rad.append(radPr)
-                rad.append(base)
-                parent_omml.append(rad)
-            
-            elif tag == 'mroot':
-                # Nth root
-                rad = OxmlElement('m:rad')
-                deg = OxmlElement('m:deg')
-                base = OxmlElement('m:e')
-                
-                children = list(elem)
-                if len(children) >= 2:
-                    convert_element(children[0], base)
-                    convert_element(children[1], deg)
-                
-                rad.append(deg)
-                rad.append(base)
-                parent_omml.append(rad)
-            
-            elif tag == 'munder':
-                # Underscript
-                func = OxmlElement('m:func')
-                fName = OxmlElement('m:fName')
-                base = OxmlElement('m:e')
-                
-                children = list(elem)
-                if len(children) >= 2:
-                    convert_element(children[0], fName)
-                    convert_element(children[1], base)
-                
-                func.append(fName)
-                func.append(base)
-                parent_omml.append(func)
-            
-            elif tag == 'mover':
-                # Overscript (like accent)
-                acc = OxmlElement('m:acc')
-                accPr = OxmlElement('m:accPr')
-                base = OxmlElement('m:e')
-                
-                children = list(elem)
-                if len(children) >= 2:
-                    convert_element(children[0], base)
-                    # Second child is the accent character
-                    if children[1].text:
-                        chrElem = OxmlElement('m:chr')
-                        chrElem.set(qn('m:val'), children[1].text)
-                        accPr.append(chrElem)
-                
-                acc.append(accPr)
-                acc.append(base)
-                parent_omml.append(acc)
-            
-            elif tag == 'munderover':
-                # Under and over script (like limits)
-                limLow = OxmlElement('m:limLow')
-                limUpp = OxmlElement('m:limUpp')
-                base = OxmlElement('m:e')
-                lim = OxmlElement('m:lim')
-                
-                children = list(elem)
-                if len(children) >= 3:
-                    convert_element(children[0], base)
-                    # Create nested structure for under and over
-                    innerBase = OxmlElement('m:e')
-                    convert_element(children[0], innerBase)
-                    limLow.append(innerBase)
-                    
-                    underLim = OxmlElement('m:lim')
-                    convert_element(children[1], underLim)
-                    limLow.append(underLim)
-                    
-                    limUpp.append(limLow)
-                    overLim = OxmlElement('m:lim')
-                    convert_element(children[2], overLim)
-                    limUpp.append(overLim)
-                    
-                    parent_omml.append(limUpp)
-                else:
-                    # Fallback
-                    for child in children:
-                        convert_element(child, parent_omml)
-            
-            elif tag == 'mfenced':
-                # Fenced expression (parentheses, brackets, etc.)
-                d = OxmlElement('m:d')
-                dPr = OxmlElement('m:dPr')
-                
-                # Get opening and closing characters
-                open_char = elem.get('open', '(')
-                close_char = elem.get('close', ')')
-                
-                begChr = OxmlElement('m:begChr')
-                begChr.set(qn('m:val'), open_char)
-                dPr.append(begChr)
-                
-                endChr = OxmlElement('m:endChr')
-                endChr.set(qn('m:val'), close_char)
-                dPr.append(endChr)
-                
-                d.append(dPr)
-                
-                # Add content
-                base = OxmlElement('m:e')
-                for child in elem:
-                    convert_element(child, base)
-                d.append(base)
-                
-                parent_omml.append(d)
-            
-            elif tag == 'mtable':
-                # Matrix/Table
-                matrix = OxmlElement('m:m')
-                
-                for row_elem in elem:
-                    if row_elem.tag.split('}')[-1] == 'mtr':
-                        mr = OxmlElement('m:mr')
-                        for cell_elem in row_elem:
-                            if cell_elem.tag.split('}')[-1] == 'mtd':
-                                e = OxmlElement('m:e')
-                                for child in cell_elem:
-                                    convert_element(child, e)
-                                mr.append(e)
-                        matrix.append(mr)
-                
-                parent_omml.append(matrix)
-            
-            elif tag == 'mrow' or tag == 'math':
-                # Row or root - process children
-                for child in elem:
-                    convert_element(child, parent_omml)
-            
-            else:
-                # Default: process children
-                for child in elem:
-                    convert_element(child, parent_omml)
-        
-        # Convert the MathML tree
-        convert_element(mathml, omml)
-        
+        _convert_mathml(mathml, omml, decode_entities)
         return omml
     
     except Exception as e:
@@ -458,22 +522,23 @@ def mathml_to_omml(mathml_str: str) -> Optional[OxmlElement]:
         return None
 
 
-def convert_latex_to_omml(latex: str, is_block: bool = False) -> Optional[OxmlElement]:
-    """Convert LaTeX formula to OMML for Word"""
+def _render_latex_to_omml(latex: str) -> Optional[OxmlElement]:
+    """Render a LaTeX formula to a new OMML element without caching
+    
+    Walks latex2mathml's element tree directly instead of serializing it to
+    a MathML string and parsing that back.
+    """
     try:
-        if not latex:
-            return None
-        
-        # Convert LaTeX to MathML
+        # Convert LaTeX to a MathML element tree
         try:
-            mathml = latex_to_mathml(latex)
+            mathml = latex_to_mathml_tree(latex)
         except Exception as e:
             log.error(f"latex2mathml conversion failed for: {latex[:50]}... Error: {e}")
             return None
         
         # Convert MathML to OMML
         try:
-            omml = mathml_to_omml(mathml)
+            omml = mathml_tree_to_omml(mathml, decode_entities=True)
         except Exception as e:
             log.error(f"mathml_to_omml failed. Error: {e}")
             return None
@@ -485,22 +550,252 @@ def convert_latex_to_omml(latex: str, is_block: bool = False) -> Optional[OxmlEl
         return None
 
 
-def parse_markdown(content: str) -> List[Dict[str, Any]]:
-    """Parse markdown content to tokens"""
-    log.info("Parsing Markdown content")
+# Persistent formula store shared by all processes, opened on first use
+_formula_store: Optional[FormulaStore] = None
+_formula_store_lock = threading.Lock()
+
+
+def _formula_store_version() -> str:
+    """Version tag of stored formulas: changes with the converter or latex2mathml"""
+    try:
+        latex2mathml_version = importlib.metadata.version('latex2mathml')
+    except importlib.metadata.PackageNotFoundError:
+        latex2mathml_version = 'unknown'
+    return f"{CONVERTER_VERSION}/latex2mathml-{latex2mathml_version}"
+
+
+def get_formula_store() -> Optional[FormulaStore]:
+    """Get the persistent formula store, or None if disabled or unavailable"""
+    global _formula_store
+    
+    if not config.FORMULA_STORE_PATH:
+        return None
+    if _formula_store is None:
+        with _formula_store_lock:
+            if _formula_store is None:
+                try:
+                    _formula_store = FormulaStore(
+                        config.FORMULA_STORE_PATH,
+                        _formula_store_version(),
+                        config.FORMULA_STORE_MAX_ENTRIES
+                    )
+                except Exception as e:
+                    log.warning(f"Formula store disabled: {e}")
+                    config.FORMULA_STORE_PATH = ''
+                    return None
+    return _formula_store
+
+
+def _load_or_render(latex: str) -> Optional[OxmlElement]:
+    """Load a formula from the persistent store, rendering and storing it on a miss"""
+    store = get_formula_store()
+    if store is not None:
+        found, xml = store.get(latex)
+        if found:
+            return parse_xml(xml) if xml is not None else None
+    
+    template = _render_latex_to_omml(latex)
+    if store is not None:
+        store.put(latex, etree.tostring(template) if template is not None else None)
+    return template
+
+
+def convert_latex_to_omml(latex: str, is_block: bool = False) -> Optional[OxmlElement]:
+    """Convert LaTeX formula to OMML for Word
+    
+    Formulas are normalized first so equivalent spellings share one entry.
+    Rendered formulas are memoized in a bounded LRU cache, backed by the
+    persistent formula store; each call returns a fresh deep copy that can
+    be inserted into the document.
+    """
+    if not latex:
+        return None
+    
+    with stage('formulas'):
+        latex = normalize_latex(latex)
+        template = _formula_cache.get(latex, _MISSING)
+        if template is _MISSING:
+            template = _load_or_render(latex)
+            _formula_cache.put(latex, template)
+        
+        return copy.deepcopy(template) if template is not None else None
+
+
+def _render_formula_batch(formulas: List[str]) -> List[Optional[bytes]]:
+    """Render formulas to serialized OMML (None where rendering failed)
+
+    Module level so it can be sent to formula pool workers.
+    """
+    results = []
+    for latex in formulas:
+        omml = _render_latex_to_omml(latex)
+        results.append(etree.tostring(omml) if omml is not None else None)
+    return results
+
+
+def _collect_formulas(tokens: List[Dict[str, Any]]) -> List[str]:
+    """Distinct normalized formulas of a token list that are not in the memory cache, in document order"""
+    formulas: Dict[str, None] = {}
+    for token in tokens:
+        token_type = token.type
+        if token_type == 'inline':
+            for child in token.children or ():
+                if child.type == 'math_inline' and child.content:
+                    formulas[normalize_latex(child.content)] = None
+        elif token_type in ('math_block', 'math_block_end') and token.content:
+            formulas[normalize_latex(token.content)] = None
+    return [latex for latex in formulas if latex not in _formula_cache]
+
+
+def prerender_formulas(tokens: List[Dict[str, Any]]) -> int:
+    """Load a document's uncached formulas and render the rest in parallel
+    
+    Formulas missing from the memory cache are first looked up in the
+    persistent store in one batch. When at least FORMULA_PARALLEL_MIN are
+    still missing and the formula pool is available, they are rendered on
+    it (workers return serialized OMML, which is parsed here); otherwise
+    they are rendered here. Everything is put into the memory cache, so the
+    token walk finds every formula there. Returns the number of formulas
+    rendered in parallel.
+    """
+    store = get_formula_store()
+    if store is None and config.FORMULA_WORKERS < 2:
+        return 0
+    
+    # More would only evict each other from the cache before the walk uses them
+    missing = _collect_formulas(tokens)[:config.FORMULA_CACHE_SIZE]
+    if not missing:
+        return 0
+    
+    with stage('formulas'):
+        if store is not None:
+            stored = store.get_many(missing)
+            for latex, (_, xml) in stored.items():
+                _formula_cache.put(latex, parse_xml(xml) if xml is not None else None)
+            missing = [latex for latex in missing if latex not in stored]
+        
+        pool = get_formula_pool() if len(missing) >= config.FORMULA_PARALLEL_MIN else None
+        if pool is None:
+            if store is not None:
+                # Render here so the walk does not look them up in the store again
+                for latex in missing:
+                    template = _render_latex_to_omml(latex)
+                    _formula_cache.put(latex, template)
+                    store.put(latex, etree.tostring(template) if template is not None else None)
+            return 0
+        
+        # A few batches per worker keeps them busy without per-formula IPC
+        batch_size = max(16, -(-len(missing) // (config.FORMULA_WORKERS * 4)))
+        batches = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+        try:
+            results = list(pool.map(_render_formula_batch, batches))
+        except Exception as e:
+            log.warning(f"Parallel formula rendering failed, rendering serially: {e!r}")
+            if isinstance(e, BrokenExecutor):
+                # A worker died; start a fresh pool for the next document
+                shutdown_formula_pool()
+            return 0
+        
+        for batch, rendered in zip(batches, results):
+            for latex, xml in zip(batch, rendered):
+                _formula_cache.put(latex, parse_xml(xml) if xml is not None else None)
+                if store is not None:
+                    store.put(latex, xml)
+    
+    log.info(f"Rendered {len(missing)} formulas on {config.FORMULA_WORKERS} processes")
+    return len(missing)
+
+
+def warm_formula_cache() -> int:
+    """Load the most used stored formulas into the memory cache; returns how many"""
+    store = get_formula_store()
+    if store is None:
+        return 0
+    
+    limit = min(config.FORMULA_STORE_WARM, config.FORMULA_CACHE_SIZE)
+    entries = store.most_used(limit) if limit > 0 else []
+    for latex, xml in entries:
+        _formula_cache.put(latex, parse_xml(xml) if xml is not None else None)
+    log.info(f"Formula cache warmed with {len(entries)} stored formulas")
+    return len(entries)
+
+
+def flush_formula_store() -> None:
+    """Write formulas rendered since the last flush to the persistent store"""
+    if _formula_store is not None:
+        _formula_store.flush()
+
+
+def get_formula_store_stats() -> Dict[str, Any]:
+    """Return counters of the persistent formula store"""
+    if _formula_store is None:
+        return {"enabled": bool(config.FORMULA_STORE_PATH)}
+    return {"enabled": True, **_formula_store.stats()}
+
+
+def get_formula_cache_stats() -> Dict[str, Any]:
+    """Return hit/miss counters of the formula cache"""
+    return _formula_cache.stats()
+
+
+# Progress callback: called with (tokens processed, total tokens)
+ProgressCallback = Callable[[int, int], None]
+
+# Report progress at most this often (in tokens) to keep callback overhead low
+PROGRESS_INTERVAL = 256
+
+
+# Prebuilt parsers keyed by their option set
+_parsers: Dict[Tuple, MarkdownIt] = {}
+_parsers_lock = threading.Lock()
+
+
+def get_markdown_parser(math_delimiters: str = 'dollars') -> MarkdownIt:
+    """Get a shared, fully initialized MarkdownIt parser for an option set
+    
+    Parsers are built once per option set; parsing afterwards only reads the
+    compiled rule chains, so one instance can serve concurrent conversions.
+    """
+    key = (math_delimiters,)
+    md = _parsers.get(key)
+    if md is not None:
+        return md
+    
+    with _parsers_lock:
+        md = _parsers.get(key)
+        if md is None:
+            # Initialize markdown-it with LaTeX support
+            md = (
+                MarkdownIt('commonmark', {'breaks': True, 'html': True})
+                .use(texmath_plugin, delimiters=math_delimiters)
+                .enable(['table', 'strikethrough'])
+            )
+            # Rule chains compile lazily on first use; do it while holding the lock
+            md.parse('x')
+            _parsers[key] = md
+    return md
+
+
+def parse_markdown(
+    content: str,
+    math_delimiters: str = 'dollars',
+    env: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    """Parse markdown content to tokens
+    
+    If given, ``env`` receives the parser environment, including the link
+    reference definitions under ``'references'``.
+    """
+    log.debug("Parsing Markdown content")
     
     try:
-        # Initialize markdown-it with LaTeX support
-        md = (
-            MarkdownIt('commonmark', {'breaks': True, 'html': True})
-            .use(texmath_plugin, delimiters='dollars')
-            .enable('table')
-        )
+        md = get_markdown_parser(math_delimiters)
         
         # Parse to tokens
-        tokens = md.parse(content)
+        with stage('parse'):
+            tokens = md.parse(content, env)
         
-        log.info(f"Parsed {len(tokens)} tokens from Markdown")
+        log.debug(f"Parsed {len(tokens)} tokens from Markdown")
         return tokens
     
     except Exception as e:
@@ -508,21 +803,195 @@ def parse_markdown(content: str) -> List[Dict[str, Any]]:
         raise Exception(f"Failed to parse Markdown: {e}")
 
 
-def tokens_to_docx_paragraphs(doc: Document, tokens: List[Dict[str, Any]]) -> Tuple[List, List]:
-    """Convert markdown tokens to Word document paragraphs"""
+# Rendered top-level blocks: (template, block type, source hash[, link
+# reference definitions hash]) ->
+# (body elements, numbering instances used by them) to copy into the next
+# document converted from the same Markdown
+_block_cache = LRUCache(config.BLOCK_CACHE_SIZE, config.BLOCK_CACHE_MAX_CHARS)
+
+_W_P = qn('w:p')
+_W_SECTPR = qn('w:sectPr')
+_W_VAL = qn('w:val')
+
+_OOXML_NAMESPACES = {'w': nsmap['w'], 'r': nsmap['r']}
+_find_num_ids = etree.XPath('.//w:numPr/w:numId', namespaces=_OOXML_NAMESPACES)
+# Relationship ids point into the package of the document they were built for
+_has_relationships = etree.XPath('boolean(.//@r:id | .//@r:embed)', namespaces=_OOXML_NAMESPACES)
+
+
+def _block_end(tokens: List[Dict[str, Any]], start: int) -> int:
+    """Index of the token following the top-level block starting at ``start``"""
+    depth = 0
+    i = start
+    while i < len(tokens):
+        depth += tokens[i].nesting
+        i += 1
+        if depth <= 0:
+            break
+    return i
+
+
+def _body_content_end(body) -> int:
+    """Index in the body where the next block element is inserted (before sectPr)"""
+    n = len(body)
+    return n - 1 if n and body[n - 1].tag == _W_SECTPR else n
+
+
+def _cache_block(body, key: Tuple, start: int, size: int, numbering: List[Tuple[int, bool, int]]) -> None:
+    """Store the elements added to the body since ``start`` under ``key``
+    
+    ``numbering`` lists the (numId, is_ordered, level) instances created for the
+    block's lists; blocks referring to any other numbering are not cached.
+    """
+    elements = body[start:_body_content_end(body)]
+    own_ids = {str(num_id) for num_id, _, _ in numbering}
+    for elem in elements:
+        if _has_relationships(elem):
+            return
+        if any(numId.get(_W_VAL) not in own_ids for numId in _find_num_ids(elem)):
+            return
+    templates = tuple(copy.deepcopy(e) for e in elements)
+    _block_cache.put(key, (templates, tuple(numbering)), size=size)
+
+
+def _replay_block(doc: Document, cached: Tuple, list_manager: 'ListManager', paragraphs: List) -> None:
+    """Append copies of a cached block to the document body
+    
+    Lists get new numbering instances so they restart just like freshly
+    built ones.
+    """
+    templates, numbering = cached
+    renumber = {
+        str(num_id): str(list_manager.get_new_num_id(is_ordered, level))
+        for num_id, is_ordered, level in numbering
+    }
+    
+    body = doc.element.body
+    sectPr = body.sectPr
+    for template in templates:
+        elem = copy.deepcopy(template)
+        if renumber:
+            for numId in _find_num_ids(elem):
+                numId.set(_W_VAL, renumber[numId.get(_W_VAL)])
+        if sectPr is not None:
+            sectPr.addprevious(elem)
+        else:
+            body.append(elem)
+        if elem.tag == _W_P:
+            paragraphs.append(Paragraph(elem, doc._body))
+
+
+def get_block_cache_stats() -> Dict[str, Any]:
+    """Return hit/miss counters of the rendered block cache"""
+    return _block_cache.stats()
+
+
+def _references_digest(references: Optional[Dict[str, Any]]) -> bytes:
+    """Hash of the link reference definitions of a document"""
+    definitions = sorted(
+        (label, ref.get('href', ''), ref.get('title', ''))
+        for label, ref in (references or {}).items()
+    )
+    return hashlib.sha1(repr(definitions).encode('utf-8')).digest()
+
+
+def _count_tokens(stats, tokens: List[Dict[str, Any]]) -> None:
+    """Add token, formula, table and cell counts of a token list to ``stats``"""
+    formulas = tables = cells = 0
+    for token in tokens:
+        token_type = token.type
+        if token_type == 'inline':
+            formulas += sum(1 for child in token.children or () if child.type == 'math_inline')
+        elif token_type in ('math_block', 'math_block_end'):
+            formulas += 1
+        elif token_type == 'table_open':
+            tables += 1
+        elif token_type in ('th_open', 'td_open'):
+            cells += 1
+    stats.count('tokens', len(tokens))
+    stats.count('formulas', formulas)
+    stats.count('tables', tables)
+    stats.count('cells', cells)
+
+
+def tokens_to_docx_paragraphs(
+    doc: Document,
+    tokens: List[Dict[str, Any]],
+    progress: Optional[ProgressCallback] = None,
+    source: Optional[str] = None,
+    template_path: Optional[str] = None,
+    list_manager: Optional[ListManager] = None,
+    references: Optional[Dict[str, Any]] = None
+) -> Tuple[List, List]:
+    """Convert markdown tokens to Word document paragraphs
+    
+    If given, ``progress`` is called periodically with the number of tokens
+    processed and the total number of tokens.
+    
+    When ``source`` (the Markdown the tokens were parsed from) is given,
+    top-level blocks are looked up in the block cache by the hash of their
+    source lines, so re-converting an edited document only rebuilds the
+    blocks that changed. ``template_path`` scopes the cache to the template
+    the document was created from. ``references`` are the link reference
+    definitions the parser collected (``env['references']``); blocks that
+    could use one are also keyed by them.
+    
+    Pass the same ``list_manager`` when converting a document in several
+    token batches so list numbering continues across them.
+    """
+    stats = current_stats()
+    started = time.perf_counter() if stats else 0.0
+    
+    prerender_formulas(tokens)
+    
     paragraphs = []
     numbering_configs = []
     list_level = 0
     list_stack = []
     
     # Initialize numbering manager
-    list_manager = ListManager(doc)
+    if list_manager is None:
+        list_manager = ListManager(doc)
+    
+    total = len(tokens)
+    next_report = PROGRESS_INTERVAL
+    
+    use_block_cache = source is not None and config.BLOCK_CACHE_SIZE > 0
+    source_lines = source.replace('\r\n', '\n').split('\n') if use_block_cache else None
+    references_digest = _references_digest(references) if use_block_cache else b''
+    body = doc.element.body
+    # Block being rendered for the cache: (end index, key, body start, size,
+    # numbering instances created for it)
+    recording = None
     
     i = 0
     while i < len(tokens):
+        if progress and i >= next_report:
+            progress(i, total)
+            next_report = i + PROGRESS_INTERVAL
+        
+        if recording is not None and i >= recording[0]:
+            _cache_block(body, *recording[1:])
+            recording = None
+        
         token = tokens[i]
         token_type = token.type
         
+        if (use_block_cache and recording is None and token.level == 0 and token.map
+                and token.nesting >= 0):
+            span = '\n'.join(source_lines[token.map[0]:token.map[1]])
+            key = (template_path or '', token_type, hashlib.sha1(span.encode('utf-8')).digest())
+            if '[' in span:
+                # "[text][label]" and "[label]" resolve against definitions
+                # anywhere in the document, not just in this block
+                key += (references_digest,)
+            cached = _block_cache.get(key)
+            if cached is not None:
+                _replay_block(doc, cached, list_manager, paragraphs)
+                i = _block_end(tokens, i)
+                continue
+            recording = (_block_end(tokens, i), key, _body_content_end(body), len(span), [])
+        
         if token_type == 'heading_open':
             level = int(token.tag[1])  # h1 -> 1, h2 -> 2, etc.
             
@@ -564,7 +1033,9 @@ def tokens_to_docx_paragraphs(doc: Document, tokens: List[Dict[str, Any]]) -> Tu
             is_ordered = token_type == 'ordered_list_open'
             
             # Create a new numbering instance for this list
-            num_id = list_manager.get_new_num_id(is_ordered)
+            num_id = list_manager.get_new_num_id(is_ordered, list_level - 1)
+            if recording is not None:
+                recording[4].append((num_id, is_ordered, list_level - 1))
             
             list_stack.append({
                 'type': 'ordered' if is_ordered else 'bullet',
@@ -594,10 +1065,7 @@ def tokens_to_docx_paragraphs(doc: Document, tokens: List[Dict[str, Any]]) -> Tu
                     
                     if list_info:
                         # Apply style for basic formatting
-                        if list_info['type'] == 'ordered':
-                            para.style = 'List Number'
-                        else:
-                            para.style = 'List Bullet'
+                        list_manager.apply_list_style(para, list_info['type'] == 'ordered')
                             
                         # Apply unique numbering to force reset and level
                         ListManager.set_paragraph_numbering(
@@ -675,168 +1143,381 @@ def tokens_to_docx_paragraphs(doc: Document, tokens: List[Dict[str, Any]]) -> Tu
                 paragraphs.append(para)
         
         elif token_type == 'table_open':
-            # 1. Look ahead to find table dimensions and alignments
-            rows = 0
-            cols = 0
-            temp_i = i + 1
-            while temp_i < len(tokens) and tokens[temp_i].type != 'table_close':
-                if tokens[temp_i].type == 'tr_open':
-                    rows += 1
-                if rows == 1 and tokens[temp_i].type in ('th_open', 'td_open'):
-                    cols += 1
-                temp_i += 1
-            
-            # 2. Add Word table with beautiful styling
-            table = doc.add_table(rows=rows, cols=cols)
-            table.style = 'Light Grid Accent 1'  # 使用更美观的表格样式
-            
-            # 设置表格边框为浅灰色
-            tbl = table._element
-            tblPr = tbl.tblPr
-            if tblPr is None:
-                tblPr = OxmlElement('w:tblPr')
-                tbl.insert(0, tblPr)
-            
-            # 设置表格边框
-            tblBorders = OxmlElement('w:tblBorders')
-            for border_name in ['top', 'left', 'bottom', 'right', 'insideH', 'insideV']:
-                border = OxmlElement(f'w:{border_name}')
-                border.set(qn('w:val'), 'single')
-                border.set(qn('w:sz'), '4')  # 细边框
-                border.set(qn('w:color'), 'CCCCCC')  # 浅灰色边框
-                tblBorders.append(border)
-            tblPr.append(tblBorders)
-            
-            # 3. Process table tokens
-            row_idx = -1
-            col_idx = -1
-            
-            i += 1
-            while i < len(tokens) and tokens[i].type != 'table_close':
-                t = tokens[i]
-                if t.type == 'tr_open':
-                    row_idx += 1
-                    col_idx = -1
-                elif t.type in ('th_open', 'td_open'):
-                    is_header = t.type == 'th_open'
-                    col_idx += 1
-                    cell = table.cell(row_idx, col_idx)
-                    
-                    if is_header:
-                        # Apply shading to header cells with better color
-                        tcPr = cell._tc.get_or_add_tcPr()
-                        shd = OxmlElement('w:shd')
-                        shd.set(qn('w:val'), 'clear')
-                        shd.set(qn('w:color'), 'auto')
-                        shd.set(qn('w:fill'), 'E8E8E8')  # 稍深的浅灰色背景
-                        tcPr.append(shd)
-                    
-                    # 为所有单元格添加内边距
-                    tcPr = cell._tc.get_or_add_tcPr()
-                    tcMar = OxmlElement('w:tcMar')
-                    for margin_name in ['top', 'left', 'bottom', 'right']:
-                        margin = OxmlElement(f'w:{margin_name}')
-                        margin.set(qn('w:w'), '100')  # 单元格内边距
-                        margin.set(qn('w:type'), 'dxa')
-                        tcMar.append(margin)
-                    tcPr.append(tcMar)
-                    
-                    # Clear default paragraph in cell if it exists
-                    if cell.paragraphs and not cell.paragraphs[0].text:
-                        para = cell.paragraphs[0]
-                    else:
-                        para = cell.add_paragraph()
-                    
-                    # Look for content
-                    temp_j = i + 1
-                    while temp_j < len(tokens) and tokens[temp_j].type not in ('th_close', 'td_close', 'tr_close', 'table_close'):
-                        if tokens[temp_j].type == 'inline':
-                            parse_inline_content(para, tokens[temp_j], force_bold=is_header)
-                        temp_j += 1
-                    # Skip tokens we've processed as content
-                    i = temp_j - 1
-                i += 1
-            
+            i = add_table(doc, tokens, i)
             # Note: table is not a paragraph, but we might want to track it for complex layouts
             continue
         
         i += 1
     
-    log.info(f"Converted tokens to {len(paragraphs)} paragraphs")
+    if recording is not None:
+        _cache_block(body, *recording[1:])
+    
+    if progress:
+        progress(total, total)
+    
+    flush_formula_store()
+    
+    if stats:
+        stats.add_time('walk', time.perf_counter() - started)
+        _count_tokens(stats, tokens)
+    
+    log.debug(f"Converted tokens to {len(paragraphs)} paragraphs")
     return paragraphs, numbering_configs
 
 
+def _build_cell_template(width: str, is_header: bool) -> OxmlElement:
+    """Build an empty table cell with width, shading and margins"""
+    tc = OxmlElement('w:tc')
+    tcPr = OxmlElement('w:tcPr')
+    
+    tcW = OxmlElement('w:tcW')
+    tcW.set(qn('w:type'), 'dxa')
+    tcW.set(qn('w:w'), width)
+    tcPr.append(tcW)
+    
+    if is_header:
+        # Apply shading to header cells with better color
+        shd = OxmlElement('w:shd')
+        shd.set(qn('w:val'), 'clear')
+        shd.set(qn('w:color'), 'auto')
+        shd.set(qn('w:fill'), 'E8E8E8')  # 稍深的浅灰色背景
+        tcPr.append(shd)
+    
+    # 为所有单元格添加内边距
+    tcMar = OxmlElement('w:tcMar')
+    for margin_name in ['top', 'left', 'bottom', 'right']:
+        margin = OxmlElement(f'w:{margin_name}')
+        margin.set(qn('w:w'), '100')  # 单元格内边距
+        margin.set(qn('w:type'), 'dxa')
+        tcMar.append(margin)
+    tcPr.append(tcMar)
+    
+    tc.append(tcPr)
+    tc.append(OxmlElement('w:p'))
+    return tc
+
+
+def add_table(doc: Document, tokens: List[Dict[str, Any]], start: int) -> int:
+    """Add the table starting at tokens[start] (table_open) to the document
+    
+    Rows and cells are emitted directly as w:tr/w:tc elements copied from one
+    prebuilt cell per style, so building is linear in the number of cells.
+    Returns the index of the token following table_close.
+    """
+    # 1. Count columns from the first row
+    cols = 0
+    i = start + 1
+    while i < len(tokens) and tokens[i].type not in ('tr_close', 'table_close'):
+        if tokens[i].type in ('th_open', 'td_open'):
+            cols += 1
+        i += 1
+    
+    # 2. Add Word table with beautiful styling
+    table = doc.add_table(rows=0, cols=cols)
+    table.style = 'Light Grid Accent 1'  # 使用更美观的表格样式
+    
+    # 设置表格边框为浅灰色
+    tbl = table._element
+    tblPr = tbl.tblPr
+    if tblPr is None:
+        tblPr = OxmlElement('w:tblPr')
+        tbl.insert(0, tblPr)
+    
+    # 设置表格边框
+    tblBorders = OxmlElement('w:tblBorders')
+    for border_name in ['top', 'left', 'bottom', 'right', 'insideH', 'insideV']:
+        border = OxmlElement(f'w:{border_name}')
+        border.set(qn('w:val'), 'single')
+        border.set(qn('w:sz'), '4')  # 细边框
+        border.set(qn('w:color'), 'CCCCCC')  # 浅灰色边框
+        tblBorders.append(border)
+    tblPr.append(tblBorders)
+    
+    gridCols = tbl.tblGrid.gridCol_lst
+    width = gridCols[0].get(qn('w:w')) if gridCols else '0'
+    templates = {
+        True: _build_cell_template(width, is_header=True),
+        False: _build_cell_template(width, is_header=False)
+    }
+    
+    # 3. Process table tokens in one pass
+    tr = None
+    row_cells = 0
+    i = start + 1
+    while i < len(tokens) and tokens[i].type != 'table_close':
+        t = tokens[i]
+        if t.type == 'tr_open':
+            tr = OxmlElement('w:tr')
+            tbl.append(tr)
+            row_cells = 0
+        elif t.type == 'tr_close':
+            # Word requires every row to cover the full grid
+            while tr is not None and row_cells < cols:
+                tr.append(copy.deepcopy(templates[False]))
+                row_cells += 1
+        elif t.type in ('th_open', 'td_open') and tr is not None and row_cells < cols:
+            is_header = t.type == 'th_open'
+            tc = copy.deepcopy(templates[is_header])
+            tr.append(tc)
+            row_cells += 1
+            para = Paragraph(tc[-1], table)
+            
+            # Look for content
+            i += 1
+            while i < len(tokens) and tokens[i].type not in ('th_close', 'td_close', 'tr_close', 'table_close'):
+                if tokens[i].type == 'inline':
+                    parse_inline_content(para, tokens[i], force_bold=is_header)
+                i += 1
+            continue
+        i += 1
+    
+    return i + 1
+
+
+# Inline formatting state: a bit per active format
+_BOLD = 1
+_ITALIC = 2
+_CODE = 4
+_STRIKE = 8
+_LINK = 16
+
+# Formats toggled by markdown-it's *_open/*_close inline tokens
+_FORMAT_TOKENS = {
+    'strong_open': _BOLD,
+    'em_open': _ITALIC,
+    's_open': _STRIKE,
+}
+_CLOSE_TOKENS = frozenset(('strong_close', 'em_close', 's_close'))
+
+_W_R = qn('w:r')
+_W_T = qn('w:t')
+_W_BR = qn('w:br')
+_W_TAB = qn('w:tab')
+_RUN_CONTENT_RE = re.compile(r'([\t\r\n])')
+
+# Formatting state -> empty w:r element carrying its run properties
+_text_run_templates: Dict[int, OxmlElement] = {}
+
+
+def _text_run_template(state: int) -> OxmlElement:
+    """Prebuilt run for a formatting state, with rPr children in schema order"""
+    template = _text_run_templates.get(state)
+    if template is not None:
+        return template
+    
+    r = OxmlElement('w:r')
+    if state:
+        rPr = OxmlElement('w:rPr')
+        if state & _CODE:
+            rFonts = OxmlElement('w:rFonts')
+            rFonts.set(qn('w:ascii'), 'Courier New')
+            rFonts.set(qn('w:hAnsi'), 'Courier New')
+            rPr.append(rFonts)
+        if state & _BOLD:
+            rPr.append(OxmlElement('w:b'))
+        if state & _ITALIC:
+            rPr.append(OxmlElement('w:i'))
+        if state & _STRIKE:
+            rPr.append(OxmlElement('w:strike'))
+        if state & _LINK:
+            color = OxmlElement('w:color')
+            color.set(qn('w:val'), '0563C1')
+            rPr.append(color)
+        if state & _CODE:
+            sz = OxmlElement('w:sz')
+            sz.set(qn('w:val'), '20')  # 10pt
+            rPr.append(sz)
+        if state & _LINK:
+            u = OxmlElement('w:u')
+            u.set(qn('w:val'), 'single')
+            rPr.append(u)
+        r.append(rPr)
+    _text_run_templates[state] = r
+    return r
+
+
+def _append_run(parent, text: str, state: int) -> None:
+    """Append a run of ``text`` in a formatting state to a paragraph or hyperlink
+    
+    Tabs and line breaks become ``w:tab`` and ``w:br`` elements, as with
+    python-docx's ``Run.text``.
+    """
+    r = copy.deepcopy(_text_run_template(state))
+    for part in _RUN_CONTENT_RE.split(text):
+        if not part:
+            continue
+        if part == '\t':
+            etree.SubElement(r, _W_TAB)
+        elif part == '\n' or part == '\r':
+            etree.SubElement(r, _W_BR)
+        else:
+            t = etree.SubElement(r, _W_T)
+            t.text = part
+            if len(part.strip()) < len(part):
+                t.set(_XML_SPACE, 'preserve')
+    parent.append(r)
+
+
+def _add_hyperlink(paragraph, href: str) -> OxmlElement:
+    """Append an empty w:hyperlink to ``href`` to the paragraph and return it"""
+    hyperlink = OxmlElement('w:hyperlink')
+    if href.startswith('#'):
+        # Link to a bookmark in the document
+        hyperlink.set(qn('w:anchor'), href[1:])
+    else:
+        r_id = paragraph.part.relate_to(href, RT.HYPERLINK, is_external=True)
+        hyperlink.set(qn('r:id'), r_id)
+    hyperlink.set(qn('w:history'), '1')
+    paragraph._p.append(hyperlink)
+    return hyperlink
+
+
 def parse_inline_content(paragraph, inline_token, force_bold: bool = False) -> None:
-    """Parse inline content and add runs to paragraph"""
+    """Parse inline content and add runs to paragraph
+    
+    Walks the inline children once, keeping the active formatting (bold,
+    italic, code, strikethrough, link) as a bit set with a stack of the
+    states to return to on *_close tokens. Adjacent text in the same state
+    is coalesced into one run built from a prebuilt run template; soft and
+    hard breaks become ``w:br`` elements inside the run around them. Links
+    become ``w:hyperlink`` elements holding their runs.
+    """
     if not hasattr(inline_token, 'children') or not inline_token.children:
         if hasattr(inline_token, 'content') and inline_token.content:
-            run = paragraph.add_run(inline_token.content)
-            if force_bold:
-                run.bold = True
+            _append_run(paragraph._p, inline_token.content, _BOLD if force_bold else 0)
         return
     
+    state = _BOLD if force_bold else 0
+    stack: List[int] = []
+    # Element the runs go into: the paragraph, or the hyperlink being built
+    parent = paragraph._p
+    # Text of the run being collected, and its state (None while it only
+    # holds breaks, which take the state of the text they join)
+    pending: List[str] = []
+    pending_state = None
+    
     for child in inline_token.children:
         child_type = child.type
+        run_state = state
         
         if child_type == 'text':
-            run = paragraph.add_run(child.content)
-            if force_bold:
-                run.bold = True
+            text = child.content
+        
+        elif child_type == 'softbreak' or child_type == 'hardbreak':
+            pending.append('\n')
+            continue
         
-        elif child_type == 'strong':
-            run = paragraph.add_run(child.content)
-            run.bold = True
+        elif child_type in _FORMAT_TOKENS:
+            stack.append(state)
+            state |= _FORMAT_TOKENS[child_type]
+            continue
         
-        elif child_type == 'em':
-            run = paragraph.add_run(child.content)
-            run.italic = True
+        elif child_type in _CLOSE_TOKENS:
+            if stack:
+                state = stack.pop()
+            continue
         
         elif child_type == 'code_inline':
-            run = paragraph.add_run(child.content)
-            run.font.name = 'Courier New'
-            run.font.size = Pt(10)
+            # A leaf token: only its own text is code
+            text, run_state = child.content, state | _CODE
         
-        elif child_type == 'softbreak' or child_type == 'hardbreak':
-            paragraph.add_run('\n')
+        elif child_type == 'link_open':
+            if pending:
+                _append_run(parent, ''.join(pending), state if pending_state is None else pending_state)
+                pending, pending_state = [], None
+            stack.append(state)
+            href = child.attrGet('href')
+            if href:
+                parent = _add_hyperlink(paragraph, str(href))
+                state |= _LINK
+            continue
+        
+        elif child_type == 'link_close':
+            if pending:
+                _append_run(parent, ''.join(pending), state if pending_state is None else pending_state)
+                pending, pending_state = [], None
+            parent = paragraph._p
+            if stack:
+                state = stack.pop()
+            continue
         
         elif child_type == 'math_inline':
             # Try to add inline math
             omml = convert_latex_to_omml(child.content, is_block=False)
             if omml:
-                paragraph._element.append(omml)
-            else:
-                # Fallback to plain text
-                paragraph.add_run(f"${child.content}$")
+                if pending:
+                    _append_run(parent, ''.join(pending), state if pending_state is None else pending_state)
+                    pending, pending_state = [], None
+                parent.append(omml)
+                continue
+            # Fallback to plain text
+            text = f"${child.content}$"
         
         else:
             # Default: add as text if has content
-            if hasattr(child, 'content') and child.content:
-                paragraph.add_run(child.content)
+            text = child.content if hasattr(child, 'content') else None
+        
+        if not text:
+            continue
+        if pending_state is not None and pending_state != run_state:
+            _append_run(parent, ''.join(pending), pending_state)
+            pending = []
+        pending.append(text)
+        pending_state = run_state
+    
+    if pending:
+        _append_run(parent, ''.join(pending), state if pending_state is None else pending_state)
 
 
-def convert_markdown_to_word(input_path: str, output_path: str) -> str:
-    """Convert Markdown file to Word document"""
-    log.info(f"Converting Markdown to Word: {input_path} -> {output_path}")
+def convert_markdown_to_word(
+    input_path: str,
+    output_path: str,
+    progress: Optional[ProgressCallback] = None,
+    template_path: Optional[str] = None
+) -> str:
+    """Convert Markdown file to Word document
+    
+    ``template_path`` names a reference .docx to take styles and page setup
+    from; see models.templates. Files of at least
+    ``config.STREAMING_THRESHOLD_BYTES`` are converted by the streaming
+    writer in models.streaming to keep memory bounded.
+    """
+    threshold = config.STREAMING_THRESHOLD_BYTES
+    if threshold > 0 and os.path.getsize(input_path) >= threshold:
+        # Imported here: the streaming writer builds on this module
+        from models.streaming import convert_markdown_file_streaming
+        try:
+            return convert_markdown_file_streaming(input_path, output_path, progress, template_path)
+        except Exception as e:
+            log.error(f"Error streaming Markdown to Word: {e}")
+            raise Exception(f"Conversion failed: {e}")
+    
+    log.debug(f"Converting Markdown to Word: {input_path} -> {output_path}")
     
     try:
         # Read markdown file
         with open(input_path, 'r', encoding='utf-8') as f:
             markdown_content = f.read()
         
-        log.info(f"Read {len(markdown_content)} characters from input file")
+        log.debug(f"Read {len(markdown_content)} characters from input file")
         
         # Parse markdown
-        tokens = parse_markdown(markdown_content)
+        env = {}
+        tokens = parse_markdown(markdown_content, env=env)
         
-        # Create Word document
-        doc = Document()
+        # Create Word document from the cached template
+        doc = new_document(template_path)
         
         # Convert tokens to paragraphs
-        paragraphs, numbering_configs = tokens_to_docx_paragraphs(doc, tokens)
+        paragraphs, numbering_configs = tokens_to_docx_paragraphs(
+            doc, tokens, progress, source=markdown_content, template_path=template_path,
+            references=env.get('references')
+        )
         
         # Save document
-        doc.save(output_path)
-        log.info(f"Successfully created Word document: {output_path}")
+        with stage('save'):
+            doc.save(output_path)
+        log.debug(f"Successfully created Word document: {output_path}")
         
         return output_path
     
@@ -845,27 +1526,48 @@ def convert_markdown_to_word(input_path: str, output_path: str) -> str:
         raise Exception(f"Conversion failed: {e}")
 
 
-def convert_markdown_content_to_word(content: str, output_path: str) -> str:
+def _build_document(
+    content: str,
+    progress: Optional[ProgressCallback] = None,
+    template_path: Optional[str] = None
+) -> Document:
+    """Parse Markdown content and build the Word document in memory"""
+    # Parse markdown
+    log.debug("Step 1: Parsing tokens")
+    env = {}
+    tokens = parse_markdown(content, env=env)
+    
+    # Create Word document from the cached template
+    log.debug("Step 2: Initializing Document")
+    doc = new_document(template_path)
+    
+    # Convert tokens to paragraphs
+    log.debug(f"Step 3: Converting {len(tokens)} tokens to paragraphs")
+    paragraphs, numbering_configs = tokens_to_docx_paragraphs(
+        doc, tokens, progress, source=content, template_path=template_path,
+        references=env.get('references')
+    )
+    
+    return doc
+
+
+def convert_markdown_content_to_word(
+    content: str,
+    output_path: str,
+    progress: Optional[ProgressCallback] = None,
+    template_path: Optional[str] = None
+) -> str:
     """Convert Markdown content to Word document"""
-    log.info(f"Converting Markdown content to Word. Output: {output_path}")
+    log.debug(f"Converting Markdown content to Word. Output: {output_path}")
     
     try:
-        # Parse markdown
-        log.debug("Step 1: Parsing tokens")
-        tokens = parse_markdown(content)
-        
-        # Create Word document
-        log.debug("Step 2: Initializing Document")
-        doc = Document()
-        
-        # Convert tokens to paragraphs
-        log.debug(f"Step 3: Converting {len(tokens)} tokens to paragraphs")
-        paragraphs, numbering_configs = tokens_to_docx_paragraphs(doc, tokens)
+        doc = _build_document(content, progress, template_path)
         
         # Save document
         log.debug("Step 4: Saving document")
-        doc.save(output_path)
-        log.info(f"Successfully created Word document from content: {output_path}")
+        with stage('save'):
+            doc.save(output_path)
+        log.debug(f"Successfully created Word document from content: {output_path}")
         
         return output_path
     
@@ -873,3 +1575,28 @@ def convert_markdown_content_to_word(content: str, output_path: str) -> str:
         log.error(f"Error in convert_markdown_content_to_word: {str(e)}", exc_info=True)
         # Ensure we return a clean string for the exception to avoid serialization issues
         raise Exception(f"Conversion failed at internal step. Technical details: {type(e).__name__}")
+
+
+def convert_markdown_content_to_bytes(
+    content: str,
+    progress: Optional[ProgressCallback] = None,
+    template_path: Optional[str] = None
+) -> bytes:
+    """Convert Markdown content to Word document bytes without touching disk"""
+    log.debug("Converting Markdown content to Word in memory")
+    
+    try:
+        doc = _build_document(content, progress, template_path)
+        
+        # Save document
+        log.debug("Step 4: Saving document to memory")
+        buffer = BytesIO()
+        with stage('save'):
+            doc.save(buffer)
+        log.debug(f"Successfully created in-memory Word document ({buffer.tell()} bytes)")
+        
+        return buffer.getvalue()
+    
+    except Exception as e:
+        log.error(f"Error in convert_markdown_content_to_bytes: {str(e)}", exc_info=True)
+        raise Exception(f"Conversion failed at internal step. Technical details: {type(e).__name__}")
@@ -0,0 +1,182 @@
+"""
+Persistent formula store shared by all worker processes
+
+Maps LaTeX to the serialized OMML it renders to in a SQLite database (WAL
+mode, so readers in other processes are never blocked by a writer). Entries
+are tagged with a version string and only entries of the current version
+are read, so upgrading the converter or latex2mathml invalidates them.
+New entries and hit counts are buffered and written in batches.
+"""
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils import log
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS formulas ("
+    " latex TEXT NOT NULL,"
+    " version TEXT NOT NULL,"
+    " omml BLOB,"
+    " hits INTEGER NOT NULL DEFAULT 0,"
+    " used REAL NOT NULL,"
+    " PRIMARY KEY (latex, version)"
+    ") WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS formulas_used ON formulas (version, used)",
+)
+# SQLite limits the number of host parameters per statement
+_LOOKUP_BATCH = 500
+
+
+class FormulaStore:
+    """SQLite-backed map from LaTeX to serialized OMML
+
+    A stored ``None`` records a formula that failed to render. Lookups
+    return ``(found, omml)``. Writes are buffered until ``flush()`` or
+    ``flush_size`` pending entries; above ``max_entries`` the least
+    recently used entries (and all entries of other versions) are pruned.
+    Database errors are logged and treated as misses.
+    """
+
+    def __init__(self, path: Path, version: str, max_entries: int, flush_size: int = 256):
+        self.path = Path(path)
+        self.version = version
+        self.max_entries = max_entries
+        self.flush_size = flush_size
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self._pending: Dict[str, Optional[bytes]] = {}
+        self._used: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._approx_entries = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        for statement in _SCHEMA:
+            conn.execute(statement)
+        self._approx_entries = conn.execute("SELECT COUNT(*) FROM formulas").fetchone()[0]
+
+    def _connect(self) -> sqlite3.Connection:
+        """Connection of the calling thread (sqlite3 connections are not shared)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(str(self.path), timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, latex: str) -> Tuple[bool, Optional[bytes]]:
+        """Look up one formula"""
+        return self.get_many([latex]).get(latex, (False, None))
+
+    def get_many(self, formulas: Iterable[str]) -> Dict[str, Tuple[bool, Optional[bytes]]]:
+        """Look up several formulas; only found ones are in the result"""
+        formulas = list(formulas)
+        found: Dict[str, Tuple[bool, Optional[bytes]]] = {}
+        try:
+            conn = self._connect()
+            for start in range(0, len(formulas), _LOOKUP_BATCH):
+                batch = formulas[start:start + _LOOKUP_BATCH]
+                rows = conn.execute(
+                    f"SELECT latex, omml FROM formulas WHERE version = ? AND latex IN "
+                    f"({','.join('?' * len(batch))})",
+                    [self.version, *batch]
+                )
+                for latex, omml in rows:
+                    found[latex] = (True, omml)
+        except sqlite3.Error as e:
+            log.warning(f"Formula store lookup failed: {e}")
+
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(formulas) - len(found)
+            for latex in found:
+                self._used[latex] = self._used.get(latex, 0) + 1
+        return found
+
+    def put(self, latex: str, omml: Optional[bytes]) -> None:
+        """Queue a rendered formula for writing"""
+        with self._lock:
+            self._pending[latex] = omml
+            full = len(self._pending) >= self.flush_size
+        if full:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write queued formulas and hit counts"""
+        with self._lock:
+            if not self._pending and not self._used:
+                return
+            pending, self._pending = self._pending, {}
+            used, self._used = self._used, {}
+
+        now = time.time()
+        try:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO formulas (latex, version, omml, hits, used) VALUES (?, ?, ?, 1, ?)",
+                    [(latex, self.version, omml, now) for latex, omml in pending.items()]
+                )
+                conn.executemany(
+                    "UPDATE formulas SET hits = hits + ?, used = ? WHERE latex = ? AND version = ?",
+                    [(count, now, latex, self.version) for latex, count in used.items()]
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            log.warning(f"Formula store write failed: {e}")
+            return
+
+        self.writes += len(pending)
+        self._approx_entries += len(pending)
+        if self._approx_entries > self.max_entries:
+            self._prune(conn)
+
+    def _prune(self, conn: sqlite3.Connection) -> None:
+        """Drop other versions' entries, then the least recently used above 90% of the cap"""
+        try:
+            conn.execute("DELETE FROM formulas WHERE version != ?", (self.version,))
+            count = conn.execute("SELECT COUNT(*) FROM formulas").fetchone()[0]
+            excess = count - int(self.max_entries * 0.9)
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM formulas WHERE version = ? AND latex IN "
+                    "(SELECT latex FROM formulas WHERE version = ? ORDER BY used LIMIT ?)",
+                    (self.version, self.version, excess)
+                )
+                count -= excess
+            self._approx_entries = count
+        except sqlite3.Error as e:
+            log.warning(f"Formula store pruning failed: {e}")
+
+    def most_used(self, limit: int) -> List[Tuple[str, Optional[bytes]]]:
+        """The ``limit`` most used formulas of the current version"""
+        try:
+            return self._connect().execute(
+                "SELECT latex, omml FROM formulas WHERE version = ? ORDER BY hits DESC LIMIT ?",
+                (self.version, limit)
+            ).fetchall()
+        except sqlite3.Error as e:
+            log.warning(f"Formula store warm-up failed: {e}")
+            return []
+
+    def stats(self) -> Dict[str, int]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": self._approx_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "hitRate": self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,145 @@
+"""
+LaTeX normalization for mdLaTeX2Word backend
+Rewrites a formula into a canonical spelling that renders to the same OMML, so
+that ``x^2``, ``x^{2}`` and ``x ^ 2`` share one formula cache entry
+"""
+import functools
+import re
+from typing import List, Optional
+
+import config
+
+# Control word, control symbol, whitespace run or any other single character
+_TOKEN_RE = re.compile(r'\\[A-Za-z]+|\\.|\s+|.', re.DOTALL)
+
+# Commands whose braced argument is text, where spacing is significant
+_TEXT_COMMANDS = frozenset((
+    '\\text', '\\textrm', '\\textit', '\\textbf', '\\textsf', '\\texttt',
+    '\\mbox', '\\hbox', '\\operatorname'
+))
+
+# Alternative spellings of the same symbol -> canonical spelling
+_MACRO_ALIASES = {
+    '\\le': '\\leq',
+    '\\ge': '\\geq',
+    '\\ne': '\\neq',
+    '\\to': '\\rightarrow',
+    '\\gets': '\\leftarrow',
+    '\\land': '\\wedge',
+    '\\lor': '\\vee',
+    '\\lnot': '\\neg',
+    '\\owns': '\\ni',
+    '\\iff': '\\Longleftrightarrow',
+    '\\implies': '\\Longrightarrow',
+}
+
+
+def _is_control_word(token: str) -> bool:
+    return len(token) > 2 and token[0] == '\\'
+
+
+def _is_number_part(token: Optional[str]) -> bool:
+    return token is not None and (token.isdigit() or token == '.')
+
+
+def _tokenize(latex: str) -> Optional[List[str]]:
+    """Split a formula into tokens, keeping text arguments as single tokens
+
+    Returns None for formulas this module does not rewrite (comments,
+    unbalanced text arguments).
+    """
+    tokens = _TOKEN_RE.findall(latex)
+    result = []
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token == '%':
+            return None
+        result.append(token)
+        i += 1
+        if token not in _TEXT_COMMANDS:
+            continue
+
+        # Copy the argument verbatim, up to the matching brace
+        while i < len(tokens) and tokens[i].isspace():
+            i += 1
+        if i == len(tokens) or tokens[i] != '{':
+            continue
+        depth = 0
+        start = i
+        while i < len(tokens):
+            if tokens[i] == '{':
+                depth += 1
+            elif tokens[i] == '}':
+                depth -= 1
+                if depth == 0:
+                    break
+            i += 1
+        if depth:
+            return None
+        result.append(''.join(tokens[start:i + 1]))
+        i += 1
+    return result
+
+
+def _drop_whitespace(tokens: List[str]) -> List[str]:
+    """Drop insignificant whitespace and replace aliased macros
+
+    A space is only kept where removing it would merge tokens: after a
+    control word followed by a letter, between the parts of a number and
+    between a line break and an opening bracket.
+    """
+    result = []
+    for i, token in enumerate(tokens):
+        if token.isspace():
+            previous = result[-1] if result else None
+            following = tokens[i + 1] if i + 1 < len(tokens) else None
+            if previous is None or following is None:
+                continue
+            if _is_control_word(previous) and following[0].isalpha():
+                result.append(' ')
+            elif _is_number_part(previous[-1]) and _is_number_part(following[0]):
+                result.append(' ')
+            elif previous == '\\\\' and following == '[':
+                # "\\ [" is a line break followed by a bracket, not "\\[...]"
+                result.append(' ')
+            continue
+        result.append(_MACRO_ALIASES.get(token, token))
+    return result
+
+
+def _drop_braces(tokens: List[str]) -> List[str]:
+    """Unbrace single-character scripts: ``x^{2}`` -> ``x^2``"""
+    result = []
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        result.append(token)
+        i += 1
+        if token not in ('^', '_') or tokens[i:i + 1] != ['{'] or tokens[i + 2:i + 3] != ['}']:
+            continue
+        script = tokens[i + 1]
+        if len(script) != 1 or not script.isalnum():
+            continue
+        # The unbraced character must not join what follows it
+        following = tokens[i + 3] if i + 3 < len(tokens) else None
+        if following is not None and (following[0].isalnum() or following[0] in ".'"):
+            continue
+        result.append(script)
+        i += 3
+    return result
+
+
+@functools.lru_cache(maxsize=config.FORMULA_CACHE_SIZE)
+def normalize_latex(latex: str) -> str:
+    """Canonical spelling of a formula that renders to the same OMML
+
+    Drops insignificant whitespace (outside text arguments such as
+    ``\\text{...}``), braces around single-character super- and
+    subscripts, and replaces alternative macro names. Formulas with
+    comments are returned unchanged.
+    """
+    tokens = _tokenize(latex)
+    if tokens is None:
+        return latex
+    return ''.join(_drop_braces(_drop_whitespace(tokens)))
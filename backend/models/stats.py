@@ -0,0 +1,124 @@
+"""
+Per-stage timing and counts for Markdown to DOCX conversions
+
+A conversion run inside ``collect_stats()`` records how long parsing, the
+token walk, formula rendering and saving took, plus document counts.
+Instrumented code calls ``stage()``/``current_stats()``, which cost next to
+nothing when no collection is active.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+
+# Stages in pipeline order; formula rendering happens inside the token walk
+STAGES = ('parse', 'walk', 'formulas', 'save')
+COUNTERS = ('tokens', 'formulas', 'tables', 'cells')
+
+
+class ConversionStats:
+    """Stage durations (seconds) and counts of one conversion"""
+
+    def __init__(self):
+        self.durations = dict.fromkeys(STAGES, 0.0)
+        self.counts = dict.fromkeys(COUNTERS, 0)
+
+    def add_time(self, stage_name: str, seconds: float) -> None:
+        self.durations[stage_name] += seconds
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counts[name] += n
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Durations in milliseconds and counts, as returned by the API"""
+        return {
+            "durationsMs": {name: round(seconds * 1000, 3) for name, seconds in self.durations.items()},
+            "counts": dict(self.counts)
+        }
+
+
+_current: ContextVar[Optional[ConversionStats]] = ContextVar('conversion_stats', default=None)
+
+
+def current_stats() -> Optional[ConversionStats]:
+    """Stats of the conversion running in this context, if collected"""
+    return _current.get()
+
+
+@contextmanager
+def collect_stats() -> Iterator[ConversionStats]:
+    """Collect stats for the conversion run inside the ``with`` block"""
+    stats = ConversionStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Add the time spent in the ``with`` block to stage ``name``"""
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.add_time(name, time.perf_counter() - start)
+
+
+def run_with_stats(func: Callable, *args) -> Tuple[Any, Dict[str, Any]]:
+    """Run a conversion and return ``(result, stats dict)``
+
+    Module level so it can be sent to process pool workers.
+    """
+    with collect_stats() as stats:
+        result = func(*args)
+    return result, stats.to_dict()
+
+
+class StatsAggregator:
+    """Running totals over the stats of all conversions in this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.conversions = 0
+        self._total_ms = dict.fromkeys(STAGES, 0.0)
+        self._max_ms = dict.fromkeys(STAGES, 0.0)
+        self._counts = dict.fromkeys(COUNTERS, 0)
+
+    def record(self, stats: Dict[str, Any]) -> None:
+        """Add the stats dict of one conversion"""
+        with self._lock:
+            self.conversions += 1
+            for name, ms in stats["durationsMs"].items():
+                self._total_ms[name] += ms
+                if ms > self._max_ms[name]:
+                    self._max_ms[name] = ms
+            for name, n in stats["counts"].items():
+                self._counts[name] += n
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            n = self.conversions
+            return {
+                "conversions": n,
+                "stages": {
+                    name: {
+                        "totalMs": round(self._total_ms[name], 3),
+                        "avgMs": round(self._total_ms[name] / n, 3) if n else 0.0,
+                        "maxMs": round(self._max_ms[name], 3)
+                    }
+                    for name in STAGES
+                },
+                "counts": dict(self._counts)
+            }
+
+
+# Process-wide aggregate, fed by the API controllers
+conversion_stats = StatsAggregator()
@@ -0,0 +1,198 @@
+"""
+Streaming Markdown to DOCX writer for very large inputs
+
+The Markdown file is read in chunks that end at block boundaries. Each
+chunk is parsed and converted on its own, its body XML is written straight
+into ``word/document.xml`` inside the output zip and then dropped, so
+memory stays bounded by the chunk size rather than the document size.
+The remaining package parts (styles, numbering, relationships, content
+types) are written once the body is complete.
+"""
+import re
+import zipfile
+from io import BytesIO
+from pathlib import Path
+from typing import Iterator, List, Optional, TextIO, Tuple
+
+from lxml import etree
+
+import config
+from utils import log
+from models.converter import (
+    ListManager,
+    ProgressCallback,
+    parse_markdown,
+    tokens_to_docx_paragraphs
+)
+from models.stats import stage
+from models.templates import new_document
+
+DOCUMENT_PART = 'word/document.xml'
+
+_FENCE_RE = re.compile(r' {0,3}(`{3,}|~{3,})')
+_LIST_ITEM_RE = re.compile(r'(?:[*+-]|\d{1,9}[.)])(?:\s|$)')
+
+
+def _is_block_start(line: str) -> bool:
+    """Whether a non-blank line after a blank one surely starts a new top-level block
+
+    Indented lines may continue a list item or code block, and a new list
+    item may continue a loose list, so chunks are never cut before them.
+    """
+    return not line[0].isspace() and not _LIST_ITEM_RE.match(line)
+
+
+def iter_markdown_chunks(stream: TextIO, chunk_chars: int) -> Iterator[str]:
+    """Split Markdown read from ``stream`` into chunks of about ``chunk_chars``
+
+    Chunks are only cut at a blank line that is outside fenced code and
+    ``$$`` math blocks and is followed by an unindented line that does not
+    start a list item. Link reference definitions are resolved per chunk.
+    """
+    lines: List[str] = []
+    size = 0
+    fence: Optional[str] = None
+    in_math = False
+    cut_pending = False
+
+    for line in stream:
+        stripped = line.strip()
+
+        if cut_pending and stripped:
+            cut_pending = False
+            if _is_block_start(line):
+                yield ''.join(lines)
+                lines = []
+                size = 0
+
+        lines.append(line)
+        size += len(line)
+
+        # Track fenced code and math blocks, where blank lines are content
+        if fence is not None:
+            if stripped.startswith(fence) and not stripped.strip(fence[0]):
+                fence = None
+            continue
+        match = _FENCE_RE.match(line)
+        if match:
+            fence = match.group(1)
+            continue
+        if in_math:
+            if '$$' in stripped:
+                in_math = False
+            continue
+        if stripped.startswith('$$') and '$$' not in stripped[2:]:
+            in_math = True
+            continue
+
+        if not stripped and size >= chunk_chars:
+            cut_pending = True
+
+    if lines:
+        yield ''.join(lines)
+
+
+def _split_document_xml(document) -> Tuple[bytes, bytes]:
+    """Serialize the document and split it right after the ``<w:body>`` start tag"""
+    xml = etree.tostring(document, encoding='UTF-8', standalone=True)
+    index = xml.find(b'<w:body>')
+    if index >= 0:
+        index += len(b'<w:body>')
+        return xml[:index], xml[index:]
+    index = xml.find(b'<w:body/>')
+    if index < 0:
+        raise ValueError("Unexpected document.xml layout")
+    return xml[:index] + b'<w:body>', b'</w:body>' + xml[index + len(b'<w:body/>'):]
+
+
+def _serialize_body_content(body) -> bytes:
+    """Serialize the children of ``body`` without the body element itself
+
+    Serializing them inside their parent keeps lxml from repeating the
+    namespace declarations on every top-level element.
+    """
+    xml = etree.tostring(body, encoding='UTF-8')
+    # Drop the XML declaration, the <w:body ...> start tag and </w:body>
+    start = xml.index(b'>', xml.index(b'<w:body')) + 1
+    return xml[start:xml.rindex(b'</w:body>')]
+
+
+def convert_markdown_file_streaming(
+    input_path: str,
+    output_path: str,
+    progress: Optional[ProgressCallback] = None,
+    template_path: Optional[str] = None,
+    chunk_chars: Optional[int] = None
+) -> str:
+    """Convert a Markdown file to a Word document chunk by chunk
+
+    Produces the same document as convert_markdown_to_word for inputs
+    whose blocks do not depend on definitions in other chunks. Progress is
+    reported in bytes converted out of the file size.
+    """
+    chunk_chars = chunk_chars or config.STREAMING_CHUNK_CHARS
+    log.info(f"Streaming Markdown to Word: {input_path} -> {output_path}")
+
+    doc = new_document(template_path)
+    body = doc.element.body
+    sectPr = body.sectPr
+    prefix, _ = _split_document_xml(doc.element)
+    list_manager = ListManager(doc)
+
+    total = 0
+    if progress:
+        with open(input_path, 'rb') as f:
+            total = f.seek(0, 2)
+
+    processed = 0
+    chunks = 0
+    try:
+        with zipfile.ZipFile(output_path, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+            with zf.open(DOCUMENT_PART, 'w', force_zip64=True) as part:
+                part.write(prefix)
+
+                with open(input_path, 'r', encoding='utf-8') as f:
+                    for chunk in iter_markdown_chunks(f, chunk_chars):
+                        env = {}
+                        tokens = parse_markdown(chunk, env=env)
+                        tokens_to_docx_paragraphs(
+                            doc, tokens,
+                            source=chunk, template_path=template_path, list_manager=list_manager,
+                            references=env.get('references')
+                        )
+
+                        # Write everything before sectPr and drop it from the tree
+                        if sectPr is not None:
+                            body.remove(sectPr)
+                        if len(body):
+                            with stage('save'):
+                                part.write(_serialize_body_content(body))
+                            for child in list(body):
+                                body.remove(child)
+                        if sectPr is not None:
+                            body.append(sectPr)
+
+                        chunks += 1
+                        if progress:
+                            processed += len(chunk.encode('utf-8'))
+                            progress(min(processed, total), total)
+
+                # The body now only holds sectPr; close it with the rest of the document
+                _, suffix = _split_document_xml(doc.element)
+                part.write(suffix)
+
+            # Remaining parts, with numbering and relationships as they ended up
+            with stage('save'):
+                buffer = BytesIO()
+                doc.save(buffer)
+                with zipfile.ZipFile(buffer) as package:
+                    for item in package.infolist():
+                        if item.filename != DOCUMENT_PART:
+                            zf.writestr(item.filename, package.read(item))
+    except Exception:
+        # Do not leave a truncated package behind
+        Path(output_path).unlink(missing_ok=True)
+        raise
+
+    log.info(f"Successfully streamed Word document in {chunks} chunks: {output_path}")
+    return output_path
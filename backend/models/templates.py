@@ -0,0 +1,114 @@
+"""
+Template document cache for the Markdown to DOCX converter
+"""
+import copy
+import threading
+from pathlib import Path
+from typing import Optional, Tuple
+
+from docx import Document
+
+import config
+from utils import log
+from utils.cache import LRUCache
+
+
+# Styles the converter assigns by name; copied from the default template
+# into reference documents that do not define them
+REQUIRED_STYLES = [
+    'Heading 1', 'Heading 2', 'Heading 3', 'Heading 4', 'Heading 5', 'Heading 6',
+    'List Number', 'List Bullet', 'No Spacing', 'Light Grid Accent 1'
+]
+
+
+class TemplateCache:
+    """Parsed template documents, cloned for every conversion
+
+    Opening a .docx means unzipping it and parsing styles, numbering, theme
+    and settings. Each template is parsed once; conversions get a deep copy
+    of the in-memory skeleton instead. Reference templates are keyed by
+    path, modification time and size so edited files are picked up again.
+    """
+
+    def __init__(self, max_entries: int):
+        self._default: Optional[Document] = None
+        self._references = LRUCache(max_entries)
+        self._lock = threading.RLock()
+
+    def _default_template(self) -> Document:
+        if self._default is None:
+            with self._lock:
+                if self._default is None:
+                    self._default = Document()
+        return self._default
+
+    @staticmethod
+    def _reference_key(path: Path) -> Tuple:
+        stat = path.stat()
+        return (str(path.resolve()), stat.st_mtime_ns, stat.st_size)
+
+    def _load_reference(self, path: Path) -> Document:
+        """Load a reference .docx as an empty document keeping its styles"""
+        doc = Document(str(path))
+
+        # Keep only the final section properties; content is not carried over
+        body = doc.element.body
+        sectPr = body.sectPr
+        for child in list(body):
+            if child is not sectPr:
+                body.remove(child)
+
+        # Make sure every style the converter uses exists
+        default_styles = self._default_template().styles
+        for name in REQUIRED_STYLES:
+            if name not in doc.styles:
+                doc.styles.element.append(copy.deepcopy(default_styles[name].element))
+                log.warning(f"Reference template {path.name} lacks style '{name}', using default")
+
+        return doc
+
+    def identity(self, template_path: Optional[str] = None) -> str:
+        """Identify a template's current version, for keys of cached conversions"""
+        if not template_path:
+            return ''
+        path = Path(template_path)
+        try:
+            resolved, mtime_ns, size = self._reference_key(path)
+        except OSError:
+            # Conversions fail on a missing template anyway
+            return str(path)
+        return f"{resolved}@{mtime_ns}:{size}"
+
+    def new_document(self, template_path: Optional[str] = None) -> Document:
+        """Return a fresh document cloned from the default or a reference template"""
+        if not template_path:
+            return copy.deepcopy(self._default_template())
+
+        path = Path(template_path)
+        key = self._reference_key(path)
+        template = self._references.get(key)
+        if template is None:
+            with self._lock:
+                template = self._references.get(key)
+                if template is None:
+                    log.info(f"Loading reference template: {path}")
+                    template = self._load_reference(path)
+                    self._references.put(key, template)
+        return copy.deepcopy(template)
+
+
+# Process-wide template cache
+template_cache = TemplateCache(config.TEMPLATE_CACHE_SIZE)
+
+
+def new_document(template_path: Optional[str] = None) -> Document:
+    """Create a new Word document from the cached template
+
+    Uses ``config.REFERENCE_DOCX`` when no template path is given.
+    """
+    return template_cache.new_document(template_path or config.REFERENCE_DOCX)
+
+
+def template_identity(template_path: Optional[str] = None) -> str:
+    """Identity of the template ``new_document`` would use ('' for the default)"""
+    return template_cache.identity(template_path or config.REFERENCE_DOCX)
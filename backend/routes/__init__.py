@@ -1,14 +1,21 @@
 """
 API Routes for mdLaTeX2Word backend
 """
-from fastapi import APIRouter, UploadFile, File, Form
+from typing import List, Optional
+
+from fastapi import APIRouter, File, Request, UploadFile
 from pydantic import BaseModel
 
 from controllers import (
     upload_file,
     convert_file,
     convert_content,
+    convert_batch,
+    submit_job,
+    get_job,
     download_file,
+    get_stats,
+    get_metrics,
     health_check
 )
 
@@ -25,13 +32,39 @@ class ConvertFileRequest(BaseModel):
 class ConvertContentRequest(BaseModel):
     content: str
     filename: str = "converted"
+    # Return the DOCX bytes directly instead of a download URL
+    inline: bool = False
+
+
+class SubmitJobRequest(BaseModel):
+    filename: Optional[str] = None
+    content: Optional[str] = None
+    name: Optional[str] = None
 
 
 # Routes
-@router.post("/upload")
-async def upload_endpoint(file: UploadFile = File(...)):
+# The upload body is parsed by the controller as a stream, so describe the
+# multipart schema for the OpenAPI docs explicitly
+UPLOAD_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"]
+                }
+            }
+        }
+    }
+}
+
+
+@router.post("/upload", openapi_extra=UPLOAD_REQUEST_BODY)
+async def upload_endpoint(request: Request):
     """Upload a markdown file"""
-    return await upload_file(file)
+    return await upload_file(request)
 
 
 @router.post("/convert")
@@ -43,7 +76,25 @@ async def convert_endpoint(request: ConvertFileRequest):
 @router.post("/convert-content")
 async def convert_content_endpoint(request: ConvertContentRequest):
     """Convert markdown content directly to DOCX"""
-    return await convert_content(request.content, request.filename)
+    return await convert_content(request.content, request.filename, request.inline)
+
+
+@router.post("/convert-batch")
+async def convert_batch_endpoint(files: List[UploadFile] = File(...)):
+    """Convert many markdown files (or zip archives of them) into one zip of DOCX files"""
+    return await convert_batch(files)
+
+
+@router.post("/jobs")
+async def submit_job_endpoint(request: SubmitJobRequest):
+    """Submit an asynchronous conversion of an uploaded file or markdown content"""
+    return await submit_job(request.filename, request.content, request.name)
+
+
+@router.get("/jobs/{job_id}")
+async def job_status_endpoint(job_id: str):
+    """Get the status and result of a conversion job"""
+    return await get_job(job_id)
 
 
 @router.get("/download/{filename}")
@@ -52,6 +103,18 @@ async def download_endpoint(filename: str):
     return await download_file(filename)
 
 
+@router.get("/stats")
+async def stats_endpoint():
+    """Get aggregated conversion stage timings, counts and cache statistics"""
+    return await get_stats()
+
+
+@router.get("/metrics")
+async def metrics_endpoint():
+    """Get Prometheus metrics"""
+    return await get_metrics()
+
+
 @router.get("/health")
 async def health_endpoint():
     """Health check endpoint"""
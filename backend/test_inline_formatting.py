@@ -0,0 +1,62 @@
+import sys
+from io import BytesIO
+from pathlib import Path
+
+# Add backend to path
+sys.path.append(str(Path(__file__).parent))
+
+from docx import Document
+from docx.oxml.ns import qn
+
+from models.converter import convert_markdown_content_to_bytes
+
+
+def runs_of(paragraph):
+    """(text, bold, italic, strike, code, hyperlink) of each run, hyperlink runs included"""
+    result = []
+    for r in paragraph._p.iter(qn('w:r')):
+        rPr = r.find(qn('w:rPr'))
+        has = lambda tag: rPr is not None and rPr.find(qn(tag)) is not None
+        text = ''.join('\n' if c.tag == qn('w:br') else c.text or '' for c in r if c.tag != qn('w:rPr'))
+        in_link = r.getparent().tag == qn('w:hyperlink')
+        result.append((text, has('w:b'), has('w:i'), has('w:strike'), has('w:rFonts'), in_link))
+    return result
+
+
+def test_inline_formatting():
+    markdown = (
+        "Plain **bold _both_** *it* `code` ~~gone~~\n"
+        "[link **b**](https://example.com) end\n"
+    )
+    doc = Document(BytesIO(convert_markdown_content_to_bytes(markdown)))
+    paragraph = doc.paragraphs[0]
+
+    assert runs_of(paragraph) == [
+        ('Plain ', False, False, False, False, False),
+        ('bold ', True, False, False, False, False),
+        ('both', True, True, False, False, False),
+        (' ', False, False, False, False, False),
+        ('it', False, True, False, False, False),
+        (' ', False, False, False, False, False),
+        ('code', False, False, False, True, False),
+        (' ', False, False, False, False, False),
+        ('gone\n', False, False, True, False, False),
+        ('link ', False, False, False, False, True),
+        ('b', True, False, False, False, True),
+        (' end', False, False, False, False, False),
+    ]
+
+    hyperlink = paragraph._p.find(qn('w:hyperlink'))
+    relationship = doc.part.rels[hyperlink.get(qn('r:id'))]
+    assert relationship.is_external and relationship.target_ref == 'https://example.com'
+
+
+def test_reference_links_are_not_replayed_from_the_block_cache():
+    paragraph = "See [docs][r] here."
+    unresolved = Document(BytesIO(convert_markdown_content_to_bytes(paragraph)))
+    resolved = Document(BytesIO(convert_markdown_content_to_bytes(
+        paragraph + "\n\n[r]: https://example.com\n"
+    )))
+
+    assert not any(link for *_, link in runs_of(unresolved.paragraphs[0]))
+    assert [text for text, *_, link in runs_of(resolved.paragraphs[0]) if link] == ['docs']
@@ -0,0 +1,69 @@
+import re
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.append(str(Path(__file__).parent))
+
+from lxml import etree
+
+from models.converter import _render_latex_to_omml
+from models.latex_normalizer import normalize_latex
+
+ROOT = Path(__file__).parent
+CORPUS_FILES = [ROOT / 'latex-sample.md', ROOT.parent / 'test.md', ROOT.parent / 'README.md']
+MATH_RE = re.compile(r'\$\$(.+?)\$\$|\$([^$\n]+)\$', re.DOTALL)
+
+# Spellings of the same formulas as they arrive from different editors
+HANDWRITTEN = [
+    'x^2', 'x^{2}', 'x ^ 2', 'x ^{ 2 }',
+    'a_i + b_{i}', 'a_{i}+b_i',
+    'a \\le b', 'a\\leq b', 'a \\ne b', 'a\\neq{b}',
+    'f: A \\to B', 'f:A\\rightarrow B',
+    '\\alpha b', '\\alpha  b', '\\alpha\\beta',
+    '\\sum_{i=1}^{n} x_{i}', '\\sum_{i = 1}^n x_i',
+    'x^{2}3', "f^{2}'", 'x_{1}.5', '12 34', '1.5 .5',
+    '\\text{if } x \\ge 0', '\\text{if }x\\geq 0', '\\text{a  b}',
+    '\\operatorname{lim sup}_{n} a_n', '\\mathrm {d} x',
+    '\\begin{matrix} a & b \\\\ c & d \\end{matrix}',
+    '\\begin{matrix}a&b\\\\ [2pt] c&d\\end{matrix}',
+    '\\left( \\frac{1}{2} \\right)', '\\left(\\frac12\\right)',
+    'p \\land q \\implies r', 'p\\wedge q\\Longrightarrow r',
+    'a % comment\n+ b',
+]
+
+
+def corpus():
+    formulas = list(HANDWRITTEN)
+    for path in CORPUS_FILES:
+        for block, inline in MATH_RE.findall(path.read_text(encoding='utf-8')):
+            latex = (block or inline).strip()
+            formulas.append(latex)
+            # The same formula with spaced operators and braced scripts
+            formulas.append(re.sub(r'([=+\-^_])', r' \1 ', latex))
+            formulas.append(re.sub(r'([\^_])([A-Za-z0-9])', r'\1{\2}', latex))
+    return formulas
+
+
+def render(latex):
+    omml = _render_latex_to_omml(latex)
+    return etree.tostring(omml) if omml is not None else None
+
+
+def test_normalized_formulas_render_the_same():
+    for latex in corpus():
+        normalized = normalize_latex(latex)
+        assert render(normalized) == render(latex), f"{latex!r} -> {normalized!r}"
+        assert normalize_latex(normalized) == normalized
+
+
+def test_normalization_raises_cache_hit_rate():
+    formulas = corpus()
+    raw_keys = set(formulas)
+    normalized_keys = {normalize_latex(latex) for latex in formulas}
+    raw_hit_rate = 1 - len(raw_keys) / len(formulas)
+    normalized_hit_rate = 1 - len(normalized_keys) / len(formulas)
+    assert normalized_hit_rate > raw_hit_rate
+    assert normalize_latex('x ^ {2}') == normalize_latex('x^2') == 'x^2'
+    assert normalize_latex('a \\le b') == 'a\\leq b'
+    assert normalize_latex('\\text{a  b}') == '\\text{a  b}'
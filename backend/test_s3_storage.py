@@ -0,0 +1,147 @@
+import io
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+# Add backend to path
+sys.path.append(str(Path(__file__).parent))
+
+import config
+from utils import file_shard, generate_unique_filename, register_cleanup_guard
+from utils.storage import OUTPUTS, UPLOADS, S3Storage, Storage
+
+
+class ClientError(Exception):
+    def __init__(self, code):
+        super().__init__(code)
+        self.response = {'Error': {'Code': code}}
+
+
+class StubS3Client:
+    """In-memory stand-in for the parts of a boto3 S3 client S3Storage uses"""
+
+    class exceptions:
+        ClientError = ClientError
+
+    def __init__(self):
+        self.objects = {}
+        self.modified = {}
+
+    def upload_file(self, path, bucket, key):
+        self.objects[key] = Path(path).read_bytes()
+        self.modified[key] = datetime.now(timezone.utc)
+
+    def download_file(self, bucket, key, path):
+        if key not in self.objects:
+            raise ClientError('404')
+        Path(path).write_bytes(self.objects[key])
+
+    def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise ClientError('404')
+        return {'ContentLength': len(self.objects[Key])}
+
+    def get_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise ClientError('NoSuchKey')
+        return {'Body': io.BytesIO(self.objects[Key])}
+
+    def get_paginator(self, name):
+        return self
+
+    def paginate(self, Bucket, Prefix, Delimiter=None):
+        keys = sorted(key for key in self.objects if key.startswith(Prefix))
+        contents = [{'Key': key, 'LastModified': self.modified[key]} for key in keys]
+        if Delimiter is None:
+            yield {'Contents': contents}
+            return
+        prefixes = sorted({Prefix + key[len(Prefix):].split(Delimiter)[0] + Delimiter
+                           for key in keys if Delimiter in key[len(Prefix):]})
+        yield {
+            'CommonPrefixes': [{'Prefix': prefix} for prefix in prefixes],
+            'Contents': [obj for obj in contents if Delimiter not in obj['Key'][len(Prefix):]]
+        }
+
+    def delete_objects(self, Bucket, Delete):
+        for obj in Delete['Objects']:
+            self.objects.pop(obj['Key'], None)
+
+
+def make_storage(tmp_path):
+    storage = S3Storage('bucket', prefix='app/', client=StubS3Client())
+    storage.directories = {UPLOADS: tmp_path / 'uploads', OUTPUTS: tmp_path / 'outputs'}
+    for directory in storage.directories.values():
+        directory.mkdir()
+    return storage
+
+
+def test_storage_backends_must_implement_the_interface():
+    class Incomplete(Storage):
+        def allocate(self, area, original_name):
+            return original_name, Path(original_name)
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_s3_keys_and_round_trip(tmp_path):
+    storage = make_storage(tmp_path)
+    filename, local_path = storage.allocate(UPLOADS, 'notes.md')
+    assert storage.key(UPLOADS, filename) == f"app/uploads/{file_shard(filename)}/{filename}"
+    assert storage.key(OUTPUTS, 'legacy.docx') == 'app/outputs/legacy.docx'
+    with pytest.raises(ValueError):
+        storage.key(UPLOADS, '../escape.md')
+
+    local_path.write_bytes(b'# Notes\n')
+    storage.commit(UPLOADS, filename, local_path)
+    assert not local_path.exists()
+    assert storage.size(UPLOADS, filename) == 8
+    assert storage.open(UPLOADS, filename).read() == b'# Notes\n'
+    with storage.local_copy(UPLOADS, filename) as path:
+        assert path.read_bytes() == b'# Notes\n'
+    assert not path.exists()
+
+
+def test_s3_missing_objects(tmp_path):
+    storage = make_storage(tmp_path)
+    missing = generate_unique_filename('missing.md')
+    assert storage.size(UPLOADS, missing) is None
+    assert not storage.touch(UPLOADS, missing)
+    with pytest.raises(FileNotFoundError):
+        storage.fetch(UPLOADS, missing)
+    with pytest.raises(FileNotFoundError):
+        storage.open(UPLOADS, missing)
+    # No staging file is left behind by the failed download
+    assert list(storage.directories[UPLOADS].iterdir()) == []
+
+
+def test_s3_cleanup(tmp_path):
+    storage = make_storage(tmp_path)
+    client = storage.client
+    now = datetime.now(timezone.utc)
+    old = now - timedelta(seconds=config.FILE_MAX_AGE_SECONDS + 7200)
+
+    def put(key, modified):
+        client.objects[key] = b'x'
+        client.modified[key] = modified
+
+    old_shard = old.strftime('%Y%m%d%H')
+    put(f'app/outputs/{old_shard}/expired.docx', old)
+    put(f'app/outputs/{old_shard}/protected.docx', old)
+    put(f'app/outputs/{old_shard}/refreshed.docx', now)
+    put('app/uploads/legacy-expired.md', old)
+    put('app/uploads/legacy-recent.md', now)
+    put(f"app/uploads/{now.strftime('%Y%m%d%H')}/recent.md", now)
+
+    protected = storage.directories[OUTPUTS] / old_shard / 'protected.docx'
+    register_cleanup_guard(lambda path: path == protected)
+
+    assert storage.cleanup(now.timestamp()) == 2
+    assert set(client.objects) == {
+        f'app/outputs/{old_shard}/protected.docx',
+        f'app/outputs/{old_shard}/refreshed.docx',
+        'app/uploads/legacy-recent.md',
+        f"app/uploads/{now.strftime('%Y%m%d%H')}/recent.md",
+    }
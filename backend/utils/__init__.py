@@ -2,55 +2,123 @@
 Utility functions for mdLaTeX2Word backend
 Includes logging, file handling, and cleanup scheduling
 """
+import atexit
+import calendar
 import os
 import re
 import time
+from contextvars import ContextVar
 from pathlib import Path
 from datetime import datetime
-from typing import Optional
+from typing import Callable, List, Optional, Tuple
 from loguru import logger
 from apscheduler.schedulers.background import BackgroundScheduler
 
 import config
+from utils.expiry import ExpiryIndex
+from utils.logsink import BackgroundLogWriter, ConsoleTarget, LogSampler, RotatingFileTarget
+
+
+CONSOLE_FORMAT = "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan> - <level>{message}</level>"
+FILE_FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function} - {message}"
+LOG_ROTATION_BYTES = 10 * 1024 * 1024
+LOG_RETENTION_SECONDS = 7 * 24 * 3600
+
+# Background writer shared by all sinks (None when LOG_BACKGROUND is off)
+_log_writer: Optional[BackgroundLogWriter] = None
 
 
 # Configure loguru logger
-def setup_logger():
-    """Configure logger with file and console output"""
+def setup_logger(background: bool = config.LOG_BACKGROUND):
+    """Configure logger with file and console output
+
+    With ``background`` the sinks only enqueue formatted lines and a writer
+    thread writes them in batches; otherwise every line is written and
+    flushed by the logging thread itself.
+    """
+    global _log_writer
+
     # Remove default handler
     logger.remove()
+    shutdown_logger()
+
+    if background:
+        _log_writer = BackgroundLogWriter()
+        console_sink = _log_writer.sink(ConsoleTarget())
+        error_sink = _log_writer.sink(RotatingFileTarget(
+            config.LOGS_DIR / "error.log", LOG_ROTATION_BYTES, LOG_RETENTION_SECONDS))
+        combined_sink = _log_writer.sink(RotatingFileTarget(
+            config.LOGS_DIR / "combined.log", LOG_ROTATION_BYTES, LOG_RETENTION_SECONDS))
+        file_options = {}
+    else:
+        console_sink = lambda msg: print(msg, end='')
+        error_sink = config.LOGS_DIR / "error.log"
+        combined_sink = config.LOGS_DIR / "combined.log"
+        file_options = {"rotation": "10 MB", "retention": "7 days"}
     
     # Add console handler with colors
     logger.add(
-        lambda msg: print(msg, end=''),
-        format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan> - <level>{message}</level>",
+        console_sink,
+        format=CONSOLE_FORMAT,
         level="INFO",
         colorize=True
     )
     
     # Add file handler for errors
     logger.add(
-        config.LOGS_DIR / "error.log",
-        format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function} - {message}",
+        error_sink,
+        format=FILE_FORMAT,
         level="ERROR",
-        rotation="10 MB",
-        retention="7 days"
+        **file_options
     )
     
     # Add file handler for all logs
     logger.add(
-        config.LOGS_DIR / "combined.log",
-        format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function} - {message}",
+        combined_sink,
+        format=FILE_FORMAT,
         level="INFO",
-        rotation="10 MB",
-        retention="7 days"
+        **file_options
     )
     
     return logger
 
 
-# Initialize logger
+def flush_logger() -> None:
+    """Wait until queued log lines have been written"""
+    if _log_writer is not None:
+        _log_writer.flush()
+
+
+def shutdown_logger() -> None:
+    """Write out queued log lines and stop the background writer"""
+    global _log_writer
+
+    if _log_writer is not None:
+        _log_writer.stop()
+        _log_writer = None
+
+
+# Initialize logger; queued lines are written out at interpreter exit
 log = setup_logger()
+atexit.register(shutdown_logger)
+
+# Per-request INFO lines are sampled under load: the request middleware
+# decides once per request whether its lines are logged
+request_log_sampler = LogSampler(config.LOG_SAMPLE_THRESHOLD, config.LOG_SAMPLE_EVERY)
+_request_logged: ContextVar[bool] = ContextVar('request_logged', default=True)
+
+
+def sample_request_logs() -> bool:
+    """Decide whether the current request's INFO lines are logged"""
+    keep = request_log_sampler.keep()
+    _request_logged.set(keep)
+    return keep
+
+
+def log_request(message: str) -> None:
+    """Log an INFO line of the current request, unless the request is sampled out"""
+    if _request_logged.get():
+        log.opt(depth=1).info(message)
 
 
 def ensure_directory_exists(dir_path: Path) -> None:
@@ -92,32 +160,197 @@ def generate_unique_filename(original_name: str) -> str:
     return f"{sanitized_base}_{timestamp}_{random_str}{ext}"
 
 
+# Millisecond timestamp and random suffix added by generate_unique_filename
+_UNIQUE_NAME_RE = re.compile(r'_(\d{13})_[0-9a-f]{6}(?:\.[^.]*)?$')
+# Shard directory names: UTC year, month, day and hour
+_SHARD_RE = re.compile(r'^\d{10}$')
+SHARD_SECONDS = 3600
+
+
+def file_timestamp(filename: str) -> Optional[float]:
+    """Creation time (epoch seconds) embedded by generate_unique_filename, if any"""
+    match = _UNIQUE_NAME_RE.search(filename)
+    return int(match.group(1)) / 1000 if match else None
+
+
+def _shard_name(timestamp: float) -> str:
+    return time.strftime('%Y%m%d%H', time.gmtime(timestamp))
+
+
+def file_shard(filename: str) -> Optional[str]:
+    """Hourly shard a file named by generate_unique_filename is stored in, if any"""
+    timestamp = file_timestamp(filename)
+    return _shard_name(timestamp) if timestamp is not None else None
+
+
+def is_shard_name(name: str) -> bool:
+    return bool(_SHARD_RE.match(name))
+
+
+def shard_start(shard: str) -> float:
+    """Start of a shard's hour (epoch seconds)"""
+    return calendar.timegm(time.strptime(shard, '%Y%m%d%H'))
+
+
+def check_filename(filename: str) -> None:
+    """Raise ValueError unless ``filename`` is a plain file name without any path"""
+    if not filename or filename in ('.', '..') or Path(filename).name != filename or '\\' in filename:
+        raise ValueError(f"Invalid filename: {filename!r}")
+
+
+def resolve_file_path(directory: Path, filename: str) -> Path:
+    """Locate a stored file by name
+
+    Files named by generate_unique_filename live in an hourly shard
+    subdirectory derived from their timestamp; other names (and files
+    stored before sharding) live directly in ``directory``. Raises
+    ValueError for names that are not a plain filename.
+    """
+    check_filename(filename)
+
+    shard = file_shard(filename)
+    if shard is not None:
+        path = directory / shard / filename
+        if path.exists() or not (directory / filename).exists():
+            return path
+    return directory / filename
+
+
+def allocate_file_path(directory: Path, original_name: str) -> Tuple[str, Path]:
+    """Pick a unique filename in ``directory`` and schedule it for cleanup
+
+    Returns ``(filename, path)``; the shard directory is created, the file
+    itself is left to the caller to write.
+    """
+    filename = generate_unique_filename(original_name)
+    timestamp = file_timestamp(filename)
+    path = directory / _shard_name(timestamp) / filename
+    path.parent.mkdir(parents=True, exist_ok=True)
+    expiry_index.add(path, timestamp + config.FILE_MAX_AGE_SECONDS)
+    return filename, path
+
+
+# Callables that return True for files cleanup must keep (e.g. live cache entries)
+_cleanup_guards: List[Callable[[Path], bool]] = []
+
+
+def register_cleanup_guard(guard: Callable[[Path], bool]) -> None:
+    """Register a callable that protects files from cleanup"""
+    _cleanup_guards.append(guard)
+
+
+def is_protected_file(file_path: Path) -> bool:
+    """Check if any registered guard protects a file from cleanup"""
+    return any(guard(file_path) for guard in _cleanup_guards)
+
+
+# Extra cleanup steps run after the expiry index, e.g. for remote storage;
+# each takes the current time and returns the number of files deleted
+_cleanup_tasks: List[Callable[[float], int]] = []
+
+
+def register_cleanup_task(task: Callable[[float], int]) -> None:
+    """Register a callable run by every cleanup job"""
+    _cleanup_tasks.append(task)
+
+
+# Files of this process and when they may be deleted
+expiry_index = ExpiryIndex()
+
+
+def index_existing_files() -> int:
+    """Add the files already in the upload and output directories to the expiry index
+
+    Run once at startup. Files in shard directories are scheduled from the
+    timestamp in their name without a stat call; only files directly in a
+    directory (stored before sharding) are stat'ed.
+    """
+    entries = []
+    for directory in (config.UPLOAD_DIR, config.OUTPUT_DIR):
+        if not directory.exists():
+            continue
+        for entry in os.scandir(directory):
+            if entry.is_dir():
+                if not is_shard_name(entry.name):
+                    continue
+                for child in os.scandir(entry.path):
+                    timestamp = file_timestamp(child.name)
+                    if timestamp is None:
+                        try:
+                            timestamp = child.stat().st_mtime
+                        except OSError:
+                            continue
+                    entries.append((timestamp + config.FILE_MAX_AGE_SECONDS, child.path))
+            elif entry.is_file():
+                try:
+                    mtime = entry.stat().st_mtime
+                except OSError:
+                    continue
+                entries.append((mtime + config.FILE_MAX_AGE_SECONDS, entry.path))
+
+    expiry_index.clear()
+    expiry_index.add_many(entries)
+    log.info(f"Expiry index built: {len(entries)} files")
+    return len(entries)
+
+
+def _remove_empty_shard(shard_dir: Path, now: float) -> None:
+    """Remove a shard directory once its hour is over and it is empty"""
+    if not is_shard_name(shard_dir.name):
+        return
+    # New files only go to the current hour's shard
+    if shard_start(shard_dir.name) + SHARD_SECONDS + 60 > now:
+        return
+    try:
+        shard_dir.rmdir()
+    except OSError:
+        pass
+
+
 def cleanup_old_files() -> None:
-    """Clean up old files from upload and output directories"""
-    directories = [config.UPLOAD_DIR, config.OUTPUT_DIR]
+    """Clean up expired files from upload and output directories
+
+    Only entries of the expiry index that are due are examined. Protected
+    files and files touched since they were scheduled (e.g. cached outputs
+    handed out again) are rescheduled instead of deleted.
+    """
     now = time.time()
     total_deleted = 0
+    shards = set()
     
-    for directory in directories:
-        if not directory.exists():
+    for _, file_path in expiry_index.pop_due(now):
+        try:
+            mtime = file_path.stat().st_mtime
+        except OSError:
+            # Already gone, or never written
             continue
         
-        for file_path in directory.iterdir():
-            if not file_path.is_file():
-                continue
-            
-            file_age = now - file_path.stat().st_mtime
-            
-            if file_age > config.FILE_MAX_AGE_SECONDS:
-                try:
-                    file_path.unlink()
-                    total_deleted += 1
-                    log.info(f"Deleted old file: {file_path}")
-                except Exception as e:
-                    log.error(f"Failed to delete file {file_path}: {e}")
+        if is_protected_file(file_path):
+            expiry_index.add(file_path, now + config.FILE_MAX_AGE_SECONDS)
+            continue
+        if mtime + config.FILE_MAX_AGE_SECONDS > now:
+            expiry_index.add(file_path, mtime + config.FILE_MAX_AGE_SECONDS)
+            continue
+        
+        try:
+            file_path.unlink()
+            total_deleted += 1
+            shards.add(file_path.parent)
+            log.debug(f"Deleted old file: {file_path}")
+        except Exception as e:
+            log.error(f"Failed to delete file {file_path}: {e}")
+    
+    for shard_dir in shards:
+        _remove_empty_shard(shard_dir, now)
+    
+    for task in _cleanup_tasks:
+        try:
+            total_deleted += task(now)
+        except Exception as e:
+            log.error(f"Cleanup task failed: {e}")
     
     if total_deleted > 0:
-        log.info(f"Cleanup completed: {total_deleted} files deleted")
+        log.info(f"Cleanup completed: {total_deleted} files deleted, {len(expiry_index)} scheduled")
 
 
 # Global scheduler instance
@@ -132,6 +365,7 @@ def schedule_cleanup() -> None:
         log.warning("Cleanup scheduler already initialized")
         return
     
+    index_existing_files()
     _scheduler = BackgroundScheduler()
     
     # Schedule cleanup to run every hour
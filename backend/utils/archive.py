@@ -0,0 +1,100 @@
+"""
+Zip archive helpers for mdLaTeX2Word backend
+Includes a streaming zip writer and safe extraction of Markdown inputs
+"""
+import io
+import zipfile
+from pathlib import PurePosixPath
+from typing import BinaryIO, List, Optional, Tuple
+
+import config
+from utils import is_valid_file_extension
+
+
+class StreamingZipWriter:
+    """Build a zip archive incrementally and hand out completed bytes
+
+    Entries are written with data descriptors, so the archive never needs
+    to seek and each ``drain()`` returns bytes ready to send to the client.
+    """
+
+    class _Buffer(io.RawIOBase):
+        def __init__(self):
+            self.data = bytearray()
+
+        def writable(self) -> bool:
+            return True
+
+        def write(self, b) -> int:
+            self.data += b
+            return len(b)
+
+    def __init__(self):
+        self._buffer = self._Buffer()
+        self._zip = zipfile.ZipFile(self._buffer, mode='w', compression=zipfile.ZIP_DEFLATED)
+
+    def add(self, arcname: str, data: bytes, compress_type: Optional[int] = None) -> None:
+        """Add a complete entry to the archive
+
+        Pass ``zipfile.ZIP_STORED`` as ``compress_type`` for data that is
+        already compressed, such as DOCX files.
+        """
+        self._zip.writestr(arcname, data, compress_type=compress_type)
+
+    def drain(self) -> bytes:
+        """Return and clear the bytes written since the last drain"""
+        data = bytes(self._buffer.data)
+        self._buffer.data.clear()
+        return data
+
+    def close(self) -> bytes:
+        """Write the central directory and return the remaining bytes"""
+        self._zip.close()
+        return self.drain()
+
+
+def read_zip_inputs(fileobj: BinaryIO, max_files: int, max_total_size: int) -> List[Tuple[str, bytes, str]]:
+    """Read Markdown entries from a zip file
+
+    Returns ``(name, data, error)`` tuples; entries that cannot be converted
+    carry an error message and empty data. Sizes are checked against the
+    zip headers before decompressing and again while reading, so archive
+    bombs are rejected without being expanded.
+    """
+    entries = []
+    total_size = 0
+
+    with zipfile.ZipFile(fileobj) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+
+            name = PurePosixPath(info.filename).name
+            if len(entries) >= max_files:
+                raise ValueError(f"Too many files in archive (maximum {max_files})")
+
+            if not is_valid_file_extension(name):
+                entries.append((info.filename, b'', 'Unsupported file type'))
+                continue
+
+            if info.file_size > config.MAX_FILE_SIZE:
+                entries.append((info.filename, b'', 'File too large'))
+                continue
+
+            if total_size + info.file_size > max_total_size:
+                raise ValueError(f"Archive content exceeds {max_total_size} bytes")
+
+            # Never trust the declared size alone while decompressing
+            with archive.open(info) as f:
+                data = f.read(config.MAX_FILE_SIZE + 1)
+            if len(data) > config.MAX_FILE_SIZE:
+                entries.append((info.filename, b'', 'File too large'))
+                continue
+
+            total_size += len(data)
+            if total_size > max_total_size:
+                raise ValueError(f"Archive content exceeds {max_total_size} bytes")
+
+            entries.append((info.filename, data, ''))
+
+    return entries
@@ -0,0 +1,214 @@
+"""
+Caching helpers for mdLaTeX2Word backend
+Includes a thread-safe LRU cache and the converted output cache
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Optional
+
+import config
+from utils import log, register_cleanup_guard
+from utils.storage import OUTPUTS, get_storage
+
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by entry count and optional total size
+
+    Each entry carries a size (1 by default) so callers can bound the cache
+    by bytes. ``on_evict`` is called with ``(key, value)`` for every entry
+    dropped to make room, and for a value replaced by a different object.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_size: Optional[int] = None,
+        on_evict: Optional[Callable[[Hashable, Any], None]] = None
+    ):
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._size = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    @property
+    def size(self) -> int:
+        """Total size of all cached entries"""
+        return self._size
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a value and mark it as most recently used"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key: Hashable, value: Any, size: int = 1) -> None:
+        """Insert or replace a value, evicting least recently used entries"""
+        if self.max_entries <= 0:
+            return
+
+        evicted = []
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._size -= old[1]
+                if old[0] is not value:
+                    evicted.append((key, old[0]))
+            self._data[key] = (value, size)
+            self._size += size
+
+            while len(self._data) > 1 and (
+                len(self._data) > self.max_entries
+                or (self.max_size is not None and self._size > self.max_size)
+            ):
+                old_key, (old_value, old_size) = self._data.popitem(last=False)
+                self._size -= old_size
+                self.evictions += 1
+                evicted.append((old_key, old_value))
+
+        if self.on_evict:
+            for old_key, old_value in evicted:
+                self.on_evict(old_key, old_value)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove an entry without calling on_evict"""
+        with self._lock:
+            item = self._data.pop(key, None)
+            if item is None:
+                return default
+            self._size -= item[1]
+            return item[0]
+
+    def clear(self) -> None:
+        """Remove all entries and reset counters"""
+        with self._lock:
+            self._data.clear()
+            self._size = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and occupancy"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "size": self._size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hitRate": self.hits / lookups if lookups else 0.0
+        }
+
+
+class ResultCache:
+    """Content-addressed cache of converted DOCX outputs
+
+    Maps a key derived from the Markdown content and conversion options to
+    either an existing output filename in the output storage or the DOCX
+    bytes of an in-memory conversion. Live file entries are protected from the cleanup
+    job; evicted entries fall back to normal age-based cleanup.
+    """
+
+    def __init__(self, directory: Path, max_entries: int, max_bytes: int):
+        self.directory = directory
+        self._live = set()
+        self._cache = LRUCache(max_entries, max_bytes, on_evict=self._on_evict)
+
+    @staticmethod
+    def make_key(content: str, version: str, **options) -> str:
+        """Build a cache key from content, converter version and options"""
+        digest = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        return ResultCache.make_digest_key(digest, version, **options)
+
+    @staticmethod
+    def make_digest_key(digest: str, version: str, **options) -> str:
+        """Build a cache key from a SHA-256 hex digest of the content"""
+        opts = '&'.join(f"{k}={options[k]}" for k in sorted(options))
+        return f"{version}:{digest}:{opts}"
+
+    def _on_evict(self, key: str, entry: tuple) -> None:
+        self._live.discard(entry[0])
+
+    def _check_file(self, key: str, filename: str) -> bool:
+        # Restart the retention clock for the file we hand out again
+        if not get_storage().touch(OUTPUTS, filename):
+            log.warning(f"Cached output disappeared: {filename}")
+            self._cache.pop(key)
+            self._live.discard(filename)
+            return False
+        return True
+
+    def get(self, key: str) -> Optional[str]:
+        """Get the cached output filename for a key, if still stored"""
+        entry = self._cache.get(key)
+        if entry is None or entry[0] is None:
+            return None
+
+        filename = entry[0]
+        return filename if self._check_file(key, filename) else None
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        """Get the cached DOCX bytes for a key, reading a cached file if needed"""
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+
+        filename, data = entry
+        if data is not None:
+            return data
+        if not self._check_file(key, filename):
+            return None
+        try:
+            with get_storage().open(OUTPUTS, filename) as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, key: str, filename: str) -> None:
+        """Record a freshly written output file"""
+        size = get_storage().size(OUTPUTS, filename)
+        if size is None:
+            return
+        # Added after put, which drops the filename of an entry it replaces
+        self._cache.put(key, (filename, None), size)
+        self._live.add(filename)
+
+    def put_bytes(self, key: str, data: bytes) -> None:
+        """Record the DOCX bytes of an in-memory conversion"""
+        self._cache.put(key, (None, data), len(data))
+
+    def is_live(self, file_path: Path) -> bool:
+        """Check whether a file is referenced by a live cache entry"""
+        return file_path.name in self._live and self.directory in file_path.parents
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache statistics"""
+        return self._cache.stats()
+
+
+# Global result cache for converted outputs
+result_cache = ResultCache(
+    config.OUTPUT_DIR,
+    max_entries=config.RESULT_CACHE_MAX_ENTRIES,
+    max_bytes=config.RESULT_CACHE_MAX_BYTES
+)
+register_cleanup_guard(result_cache.is_live)
+
+# Upload filename -> {'contentHash', 'originalName'} recorded while streaming
+upload_digests = LRUCache(max_entries=4096)
@@ -0,0 +1,48 @@
+"""
+Expiry index for mdLaTeX2Word backend
+Time-ordered heap of files and when they become eligible for cleanup, so the
+cleanup job only looks at files that are due instead of scanning directories
+"""
+import heapq
+import threading
+from pathlib import Path
+from typing import List, Tuple
+
+
+class ExpiryIndex:
+    """Min-heap of ``(due time, path)`` entries
+
+    A path may be in the heap more than once (for example when a file is
+    rescheduled); the cleanup job treats entries for missing files as done.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, str]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def add(self, path: Path, due: float) -> None:
+        """Schedule ``path`` to be checked for cleanup at ``due`` (epoch seconds)"""
+        with self._lock:
+            heapq.heappush(self._heap, (due, str(path)))
+
+    def add_many(self, entries: List[Tuple[float, str]]) -> None:
+        """Schedule many ``(due, path)`` entries at once"""
+        with self._lock:
+            self._heap.extend(entries)
+            heapq.heapify(self._heap)
+
+    def pop_due(self, now: float) -> List[Tuple[float, Path]]:
+        """Remove and return all entries due at or before ``now``"""
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                when, path = heapq.heappop(self._heap)
+                due.append((when, Path(path)))
+        return due
+
+    def clear(self) -> None:
+        with self._lock:
+            self._heap.clear()
@@ -0,0 +1,124 @@
+"""
+Asynchronous conversion jobs for mdLaTeX2Word backend
+Tracks queued/running/done/failed conversions submitted to the worker pool
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Dict, Optional
+
+import config
+
+
+class Job:
+    """State of one submitted conversion"""
+
+    def __init__(self, job_id: str, output_filename: str):
+        self.id = job_id
+        self.output_filename = output_filename
+        self.status = 'queued'
+        self.processed = 0
+        self.total = 0
+        self.error: Optional[str] = None
+        self.stats: Optional[Dict[str, Any]] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.future: Optional[Future] = None
+
+    def update_progress(self, processed: int, total: int) -> None:
+        """Progress callback passed to the converter"""
+        self.status = 'running'
+        self.processed = processed
+        self.total = total
+
+    def finish(self, future: Future) -> None:
+        """Done callback for the conversion future
+        
+        The future resolves to ``(output, stats)`` as returned by
+        models.stats.run_with_stats.
+        """
+        if future.cancelled():
+            self.status = 'failed'
+            self.error = 'Conversion cancelled'
+        elif future.exception() is not None:
+            self.status = 'failed'
+            self.error = str(future.exception())
+        else:
+            self.status = 'done'
+            self.processed = self.total
+            _, self.stats = future.result()
+        self.finished_at = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        status = self.status
+        # Process pools cannot report token progress; fall back to the future state
+        if status == 'queued' and self.future is not None and self.future.running():
+            status = 'running'
+
+        data = {
+            "jobId": self.id,
+            "status": status,
+            "progress": {
+                "processed": self.processed,
+                "total": self.total,
+                "percent": round(self.processed * 100 / self.total, 1) if self.total else 0.0
+            },
+            "createdAt": self.created_at,
+            "finishedAt": self.finished_at
+        }
+        if status == 'done':
+            data["result"] = {
+                "outputFilename": self.output_filename,
+                "downloadUrl": f"/api/download/{self.output_filename}",
+                "stats": self.stats
+            }
+        if status == 'failed':
+            data["error"] = self.error
+        return data
+
+
+class JobStore:
+    """In-memory registry of jobs, pruned once finished jobs expire
+
+    Jobs are kept in creation order; pruning scans from the front and stops
+    at the first job created after the expiry cutoff, since no job behind it
+    can have expired.
+    """
+
+    def __init__(self, max_age_seconds: float):
+        self.max_age_seconds = max_age_seconds
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, output_filename: str) -> Job:
+        """Create and register a new queued job"""
+        job = Job(os.urandom(8).hex(), output_filename)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def remove(self, job_id: str) -> None:
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.max_age_seconds
+        expired = []
+        for job_id, job in self._jobs.items():
+            if job.created_at > cutoff:
+                break
+            # Unfinished jobs stay, without holding up the finished ones behind them
+            if job.finished_at is not None and job.finished_at <= cutoff:
+                expired.append(job_id)
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+# Global job registry; results live as long as the output files
+job_store = JobStore(config.FILE_MAX_AGE_SECONDS)
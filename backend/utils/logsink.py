@@ -0,0 +1,193 @@
+"""
+Background log writer for mdLaTeX2Word backend
+Loguru sinks that hand formatted messages to a writer thread, which writes
+them in batches so logging never blocks the event loop on I/O
+"""
+import os
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, TextIO
+
+
+class ConsoleTarget:
+    """Write batches to whatever ``sys.stdout`` is at write time, like print()"""
+
+    def write(self, text: str) -> None:
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+    def close(self) -> None:
+        pass
+
+
+class RotatingFileTarget:
+    """Append batches to a log file, rotating by size and pruning old rotations
+
+    The size is counted in encoded bytes. Rotated files are renamed to
+    ``<stem>.<timestamp><suffix>`` (millisecond resolution, plus a counter
+    if taken) and deleted once older than ``retention_seconds``.
+    """
+
+    def __init__(self, path: Path, max_bytes: int, retention_seconds: float):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.retention_seconds = retention_seconds
+        self._file: Optional[TextIO] = None
+        self._size = 0
+
+    def _open(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._size = self.path.stat().st_size
+
+    def _rotate(self) -> None:
+        self._file.close()
+        self._file = None
+        now = time.time()
+        stamp = time.strftime('%Y-%m-%d_%H-%M-%S', time.localtime(now)) + f"_{int(now * 1000) % 1000:03d}"
+        rotated = self.path.with_name(f"{self.path.stem}.{stamp}{self.path.suffix}")
+        # Several rotations within one millisecond get a counter
+        n = 1
+        while rotated.exists():
+            rotated = self.path.with_name(f"{self.path.stem}.{stamp}-{n}{self.path.suffix}")
+            n += 1
+        self.path.rename(rotated)
+
+        cutoff = time.time() - self.retention_seconds
+        for old in self.path.parent.glob(f"{self.path.stem}.*{self.path.suffix}"):
+            try:
+                if old.stat().st_mtime < cutoff:
+                    old.unlink()
+            except OSError:
+                pass
+
+    def write(self, text: str) -> None:
+        if self._file is None:
+            self._open()
+        elif self._size >= self.max_bytes:
+            self._rotate()
+            self._open()
+        self._file.write(text)
+        self._file.flush()
+        self._size += len(text.encode('utf-8'))
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class BackgroundLogWriter:
+    """Single writer thread shared by all log sinks
+
+    ``sink(target)`` returns a loguru sink that only enqueues the message.
+    The writer takes everything queued so far (up to ``max_batch``
+    messages), writes it with one call and one flush per target, then
+    sleeps ``interval`` seconds so the next batch can build up instead of
+    waking the thread for every line.
+    """
+
+    def __init__(self, interval: float = 0.05, max_batch: int = 4096):
+        self.interval = interval
+        self.max_batch = max_batch
+        self._targets: List = []
+        self._stopped = False
+        self._start()
+        # A forked worker process inherits the queue but not the thread
+        os.register_at_fork(after_in_child=self._restart)
+
+    def _restart(self) -> None:
+        if not self._stopped:
+            self._start()
+
+    def _start(self) -> None:
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self._thread.start()
+
+    def sink(self, target) -> Callable[[str], None]:
+        """Create a loguru sink writing to ``target`` from the writer thread"""
+        self._targets.append(target)
+        # Look the queue up on each call: it is replaced after a fork
+        return lambda message: self._queue.put((target, str(message)))
+
+    def _run(self) -> None:
+        get = self._queue.get
+        get_nowait = self._queue.get_nowait
+        while True:
+            item = get()
+            batch = [item]
+            while item is not None and len(batch) < self.max_batch:
+                try:
+                    item = get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+
+            pending: Dict[object, List[str]] = {}
+            flushed: List[threading.Event] = []
+            for entry in batch:
+                if isinstance(entry, threading.Event):
+                    flushed.append(entry)
+                elif entry is not None:
+                    pending.setdefault(entry[0], []).append(entry[1])
+            for target, messages in pending.items():
+                try:
+                    target.write(''.join(messages))
+                except Exception as e:
+                    # Logging must never take the writer down
+                    print(f"Log write failed: {e}", flush=True)
+            for event in flushed:
+                event.set()
+
+            if batch[-1] is None:
+                return
+            if self.interval:
+                time.sleep(self.interval)
+
+    def flush(self, timeout: Optional[float] = 5.0) -> None:
+        """Wait until everything queued so far has been written"""
+        if self._thread.is_alive():
+            event = threading.Event()
+            self._queue.put(event)
+            event.wait(timeout)
+
+    def stop(self) -> None:
+        """Write everything queued so far and close all targets"""
+        self._stopped = True
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        for target in self._targets:
+            target.close()
+
+
+class LogSampler:
+    """Rate-based sampling of high-volume log lines
+
+    ``keep()`` returns True for the first ``threshold`` calls in each
+    second and for every ``every``-th call after that. Callers check it
+    before logging, so dropped lines cost no log record at all. A
+    threshold of 0 keeps everything.
+    """
+
+    def __init__(self, threshold: int, every: int):
+        self.threshold = threshold
+        self.every = max(1, every)
+        self._second = 0
+        self._count = 0
+
+    def keep(self) -> bool:
+        if self.threshold <= 0:
+            return True
+
+        second = int(time.monotonic())
+        if second != self._second:
+            self._second = second
+            self._count = 0
+        self._count += 1
+
+        return self._count <= self.threshold or self._count % self.every == 0
@@ -0,0 +1,185 @@
+"""
+Prometheus metrics for mdLaTeX2Word backend
+Minimal counters, gauges and histograms rendered in the text exposition format
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+
+# Seconds; requests range from sub-millisecond health checks to long conversions
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# Bytes of Markdown input
+SIZE_BUCKETS = tuple(1024 * 4 ** n for n in range(10))  # 1KB .. 256MB
+
+Sample = Tuple[Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Histogram:
+    """Histogram with fixed buckets, one series per label value tuple
+
+    ``observe`` costs a bisect and a few list increments under a lock;
+    cumulative bucket counts are only computed when rendering.
+    """
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # label values -> [count per bucket ..., count above last bucket, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(values, list(data)) for values, data in self._series.items()]
+        for values, data in sorted(series):
+            labels = dict(zip(self.label_names, values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), data[:-1]):
+                cumulative += count
+                bucket_labels = _format_labels({**labels, 'le': _format_value(bound)})
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(data[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class CallbackMetric:
+    """Counter or gauge whose samples are read from ``collect`` at scrape time"""
+
+    def __init__(self, name: str, documentation: str, metric_type: str,
+                 collect: Callable[[], Iterable[Sample]]):
+        self.name = name
+        self.documentation = documentation
+        self.metric_type = metric_type
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        for labels, value in self.collect():
+            lines.append(f"{self.name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Ordered set of metrics rendered together for /api/metrics"""
+
+    def __init__(self):
+        self._metrics: List = []
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        metric = Histogram(*args, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, documentation: str, collect: Callable[[], Iterable[Sample]]) -> CallbackMetric:
+        metric = CallbackMetric(name, documentation, 'gauge', collect)
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, collect: Callable[[], Iterable[Sample]]) -> CallbackMetric:
+        metric = CallbackMetric(name, documentation, 'counter', collect)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class DirectorySize:
+    """Total size of the files in a directory tree, rescanned at most every ``max_age`` seconds"""
+
+    def __init__(self, directory: Path, max_age: float = 15.0):
+        self.directory = directory
+        self.max_age = max_age
+        self._value: Tuple[int, int] = (0, 0)
+        self._scanned_at = 0.0
+        self._lock = threading.Lock()
+
+    def _scan(self) -> Tuple[int, int]:
+        total = files = 0
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                try:
+                    total += os.stat(os.path.join(root, name)).st_size
+                    files += 1
+                except OSError:
+                    # Removed by cleanup while scanning
+                    pass
+        return total, files
+
+    def get(self) -> Tuple[int, int]:
+        """Return (bytes, files)"""
+        with self._lock:
+            if time.monotonic() - self._scanned_at > self.max_age:
+                self._value = self._scan()
+                self._scanned_at = time.monotonic()
+            return self._value
+
+
+# Global registry exposed at /api/metrics
+registry = MetricsRegistry()
+
+request_duration = registry.histogram(
+    'mdlatex2word_http_request_duration_seconds',
+    'HTTP request latency by method, route template and status code',
+    ('method', 'route', 'status')
+)
+conversion_duration = registry.histogram(
+    'mdlatex2word_conversion_duration_seconds',
+    'Conversion time by pipeline stage (formulas is part of walk; total is parse+walk+save)',
+    ('stage',)
+)
+conversion_input_size = registry.histogram(
+    'mdlatex2word_conversion_input_bytes',
+    'Size of converted Markdown inputs by endpoint',
+    ('source',),
+    buckets=SIZE_BUCKETS
+)
+
+
+def observe_conversion(stats: Dict, input_bytes: int, source: str) -> None:
+    """Record one conversion's stage durations (models.stats dict) and input size"""
+    durations = stats["durationsMs"]
+    for stage, ms in durations.items():
+        conversion_duration.observe(ms / 1000, stage)
+    total_ms = durations["parse"] + durations["walk"] + durations["save"]
+    conversion_duration.observe(total_ms / 1000, 'total')
+    conversion_input_size.observe(input_bytes, source)
@@ -0,0 +1,346 @@
+"""
+Storage backends for mdLaTeX2Word backend
+Uploads and converted outputs are kept either on the local filesystem or in an
+S3-compatible object store shared by all replicas (STORAGE_BACKEND)
+"""
+import os
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import config
+from utils import (
+    log,
+    allocate_file_path,
+    check_filename,
+    expiry_index,
+    file_shard,
+    generate_unique_filename,
+    is_protected_file,
+    register_cleanup_task,
+    resolve_file_path,
+    shard_start,
+    SHARD_SECONDS
+)
+
+# Storage areas
+UPLOADS = 'uploads'
+OUTPUTS = 'outputs'
+
+
+class Storage(ABC):
+    """Interface shared by the storage backends
+
+    Conversions read and write local files, so a stored file is read
+    through ``fetch()``/``release()`` (or ``local_copy()``), and a new file
+    is written to the local path returned by ``allocate()`` and then
+    handed to ``commit()``. Downloads use ``local_path()`` when the file is
+    on this machine and stream from ``open()`` otherwise.
+    """
+
+    kind = ''
+
+    def __init__(self):
+        # Local directories per area, also used for staging files
+        self.directories: Dict[str, Path] = {UPLOADS: config.UPLOAD_DIR, OUTPUTS: config.OUTPUT_DIR}
+
+    def staging_directory(self, area: str) -> Path:
+        """Local directory for temp files of an area (same filesystem as allocate() paths)"""
+        return self.directories[area]
+
+    @abstractmethod
+    def allocate(self, area: str, original_name: str) -> Tuple[str, Path]:
+        """Pick a unique filename and return it with the local path to write it to"""
+
+    @abstractmethod
+    def commit(self, area: str, filename: str, local_path: Path) -> None:
+        """Store the file written to an allocated local path"""
+
+    def discard(self, local_path: Path) -> None:
+        """Drop an allocated local file that will not be committed"""
+        local_path.unlink(missing_ok=True)
+
+    @abstractmethod
+    def fetch(self, area: str, filename: str) -> Path:
+        """Local path of a stored file's contents; hand it to release() when done
+
+        Raises FileNotFoundError if there is no such file and ValueError
+        for invalid names.
+        """
+
+    def release(self, local_path: Path) -> None:
+        """Give back a path returned by fetch()"""
+
+    @contextmanager
+    def local_copy(self, area: str, filename: str) -> Iterator[Path]:
+        path = self.fetch(area, filename)
+        try:
+            yield path
+        finally:
+            self.release(path)
+
+    @abstractmethod
+    def size(self, area: str, filename: str) -> Optional[int]:
+        """Size in bytes of a stored file, or None if it does not exist"""
+
+    @abstractmethod
+    def touch(self, area: str, filename: str) -> bool:
+        """Restart a file's retention period; False if it does not exist"""
+
+    @abstractmethod
+    def open(self, area: str, filename: str) -> BinaryIO:
+        """Binary stream of a stored file's contents"""
+
+    def local_path(self, area: str, filename: str) -> Optional[Path]:
+        """Path of the stored file if it lives on the local filesystem"""
+        return None
+
+    @abstractmethod
+    def location(self, area: str, filename: str) -> str:
+        """Human-readable location of a stored file"""
+
+
+class FileSystemStorage(Storage):
+    """Files in UPLOAD_DIR and OUTPUT_DIR, sharded by hour and expired by the cleanup job"""
+
+    kind = 'filesystem'
+
+    def allocate(self, area: str, original_name: str) -> Tuple[str, Path]:
+        return allocate_file_path(self.directories[area], original_name)
+
+    def commit(self, area: str, filename: str, local_path: Path) -> None:
+        # Allocated paths are already the final location
+        pass
+
+    def fetch(self, area: str, filename: str) -> Path:
+        path = resolve_file_path(self.directories[area], filename)
+        if not path.is_file():
+            raise FileNotFoundError(filename)
+        return path
+
+    def size(self, area: str, filename: str) -> Optional[int]:
+        try:
+            return resolve_file_path(self.directories[area], filename).stat().st_size
+        except OSError:
+            return None
+
+    def touch(self, area: str, filename: str) -> bool:
+        try:
+            os.utime(resolve_file_path(self.directories[area], filename))
+        except OSError:
+            return False
+        return True
+
+    def open(self, area: str, filename: str) -> BinaryIO:
+        return open(self.fetch(area, filename), 'rb')
+
+    def local_path(self, area: str, filename: str) -> Optional[Path]:
+        return resolve_file_path(self.directories[area], filename)
+
+    def location(self, area: str, filename: str) -> str:
+        return str(resolve_file_path(self.directories[area], filename))
+
+
+class S3Storage(Storage):
+    """Objects in an S3-compatible bucket (AWS S3, MinIO, ...)
+
+    Keys are ``<prefix><area>/<shard>/<filename>`` with the same hourly
+    shards as the filesystem layout. Transfers are streamed in parts by
+    boto3's managed upload and download. Expired objects are deleted by
+    the cleanup job one shard prefix at a time, together with unsharded
+    objects stored before sharding; live objects are checked against the
+    cleanup guards under their filesystem-layout path.
+    """
+
+    kind = 's3'
+
+    def __init__(self, bucket: str, prefix: str = '', client=None, **client_options):
+        super().__init__()
+        if client is None:
+            try:
+                import boto3
+            except ImportError:
+                raise RuntimeError("STORAGE_BACKEND=s3 requires boto3 (pip install boto3)")
+            client = boto3.client('s3', **client_options)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def key(self, area: str, filename: str) -> str:
+        check_filename(filename)
+        shard = file_shard(filename)
+        if shard is None:
+            return f"{self.prefix}{area}/{filename}"
+        return f"{self.prefix}{area}/{shard}/{filename}"
+
+    def ensure_bucket(self) -> None:
+        """Create the bucket if it does not exist yet"""
+        try:
+            self.client.head_bucket(Bucket=self.bucket)
+        except self.client.exceptions.ClientError:
+            self.client.create_bucket(Bucket=self.bucket)
+            log.info(f"Created storage bucket: {self.bucket}")
+
+    def _temp_path(self, area: str) -> Path:
+        directory = self.staging_directory(area)
+        fd, name = tempfile.mkstemp(dir=directory, prefix='.s3-', suffix='.tmp')
+        os.close(fd)
+        path = Path(name)
+        # Left-over temp files are removed with the local files
+        expiry_index.add(path, path.stat().st_mtime + config.FILE_MAX_AGE_SECONDS)
+        return path
+
+    @staticmethod
+    def _is_missing(error) -> bool:
+        code = error.response.get('Error', {}).get('Code')
+        return code in ('404', 'NoSuchKey', 'NotFound')
+
+    def allocate(self, area: str, original_name: str) -> Tuple[str, Path]:
+        return generate_unique_filename(original_name), self._temp_path(area)
+
+    def commit(self, area: str, filename: str, local_path: Path) -> None:
+        try:
+            self.client.upload_file(str(local_path), self.bucket, self.key(area, filename))
+        finally:
+            local_path.unlink(missing_ok=True)
+
+    def fetch(self, area: str, filename: str) -> Path:
+        key = self.key(area, filename)
+        path = self._temp_path(area)
+        try:
+            self.client.download_file(self.bucket, key, str(path))
+        except self.client.exceptions.ClientError as e:
+            path.unlink(missing_ok=True)
+            if self._is_missing(e):
+                raise FileNotFoundError(filename)
+            raise
+        except Exception:
+            path.unlink(missing_ok=True)
+            raise
+        return path
+
+    def release(self, local_path: Path) -> None:
+        local_path.unlink(missing_ok=True)
+
+    def size(self, area: str, filename: str) -> Optional[int]:
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self.key(area, filename))
+        except self.client.exceptions.ClientError as e:
+            if self._is_missing(e):
+                return None
+            raise
+        return head['ContentLength']
+
+    def touch(self, area: str, filename: str) -> bool:
+        # Object age cannot be reset cheaply; live cache entries are protected
+        # by the cleanup guards instead
+        return self.size(area, filename) is not None
+
+    def open(self, area: str, filename: str) -> BinaryIO:
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self.key(area, filename))
+        except self.client.exceptions.ClientError as e:
+            if self._is_missing(e):
+                raise FileNotFoundError(filename)
+            raise
+        return response['Body']
+
+    def location(self, area: str, filename: str) -> str:
+        return f"s3://{self.bucket}/{self.key(area, filename)}"
+
+    def _list_area(self, area: str) -> Tuple[List[str], List[dict]]:
+        """Shard prefixes of an area and the unsharded (legacy) objects directly in it"""
+        paginator = self.client.get_paginator('list_objects_v2')
+        shards, objects = [], []
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=f"{self.prefix}{area}/", Delimiter='/'):
+            shards.extend(entry['Prefix'] for entry in page.get('CommonPrefixes', []))
+            objects.extend(page.get('Contents', []))
+        return shards, objects
+
+    def _expired_keys(self, objects: Iterable[dict], local_directory: Path, now: float) -> List[dict]:
+        """Objects older than FILE_MAX_AGE_SECONDS whose local path no cleanup guard protects"""
+        max_age = config.FILE_MAX_AGE_SECONDS
+        expired = []
+        for obj in objects:
+            if obj['LastModified'].timestamp() + max_age > now:
+                continue
+            filename = obj['Key'].rsplit('/', 1)[-1]
+            if is_protected_file(local_directory / filename):
+                continue
+            expired.append({'Key': obj['Key']})
+        return expired
+
+    def _delete(self, keys: List[dict]) -> None:
+        # DeleteObjects takes at most 1000 keys per request
+        for start in range(0, len(keys), 1000):
+            self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={'Objects': keys[start:start + 1000], 'Quiet': True}
+            )
+
+    def cleanup(self, now: float) -> int:
+        """Delete objects older than FILE_MAX_AGE_SECONDS; returns the number deleted"""
+        max_age = config.FILE_MAX_AGE_SECONDS
+        paginator = self.client.get_paginator('list_objects_v2')
+        deleted = 0
+
+        for area in (UPLOADS, OUTPUTS):
+            shard_prefixes, legacy_objects = self._list_area(area)
+
+            # Objects stored before sharding sit directly under the area
+            expired = self._expired_keys(legacy_objects, self.directories[area], now)
+            self._delete(expired)
+            deleted += len(expired)
+
+            for shard_prefix in shard_prefixes:
+                shard = shard_prefix.rstrip('/').rsplit('/', 1)[-1]
+                try:
+                    # Nothing in a shard is older than its start
+                    if shard_start(shard) + max_age > now:
+                        continue
+                except ValueError:
+                    continue
+
+                objects = (
+                    obj
+                    for page in paginator.paginate(Bucket=self.bucket, Prefix=shard_prefix)
+                    for obj in page.get('Contents', [])
+                )
+                expired = self._expired_keys(objects, self.directories[area] / shard, now)
+                self._delete(expired)
+                deleted += len(expired)
+
+        return deleted
+
+
+_storage: Optional[Storage] = None
+_storage_lock = threading.Lock()
+
+
+def get_storage() -> Storage:
+    """Get the process-wide storage backend configured by STORAGE_BACKEND"""
+    global _storage
+
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                if config.STORAGE_BACKEND == 's3':
+                    storage = S3Storage(
+                        config.S3_BUCKET,
+                        prefix=config.S3_PREFIX,
+                        endpoint_url=config.S3_ENDPOINT_URL,
+                        region_name=config.S3_REGION
+                    )
+                    if config.S3_CREATE_BUCKET:
+                        storage.ensure_bucket()
+                    register_cleanup_task(storage.cleanup)
+                elif config.STORAGE_BACKEND == 'filesystem':
+                    storage = FileSystemStorage()
+                else:
+                    raise RuntimeError(f"Unknown STORAGE_BACKEND: {config.STORAGE_BACKEND}")
+                log.info(f"Storage backend: {storage.kind}")
+                _storage = storage
+    return _storage
@@ -0,0 +1,216 @@
+"""
+Streaming upload handling for mdLaTeX2Word backend
+Parses multipart bodies chunk by chunk, enforcing size limits on the fly
+"""
+import asyncio
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from fastapi import HTTPException, Request
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+import config
+from utils import log
+from utils.storage import UPLOADS, Storage
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds the configured size limit"""
+
+
+# Buffered upload data is handed to a worker thread once it reaches this size
+UPLOAD_FLUSH_BYTES = 1024 * 1024
+
+
+class StreamingFileWriter:
+    """Buffer a stream into a temp file, hashing and size-checking each chunk
+
+    ``write()`` only hashes and buffers, so the multipart callbacks can call
+    it on the event loop; ``flush()``, ``commit()`` and ``abort()`` do the
+    file I/O and are run in a worker thread. The data only appears under its
+    final name once commit() renames the temp file, so readers never observe
+    a partially written upload.
+    """
+
+    def __init__(self, directory: Path, max_size: int):
+        self.directory = directory
+        self.max_size = max_size
+        self.size = 0
+        self.buffered = 0
+        self._buffer: List[bytes] = []
+        self._sha256 = hashlib.sha256()
+        self._tmp_path: Optional[Path] = None
+        self._file = None
+
+    @property
+    def digest(self) -> str:
+        """Hex SHA-256 of the data written so far"""
+        return self._sha256.hexdigest()
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.size > self.max_size:
+            raise UploadTooLargeError(f"Upload exceeds {self.max_size} bytes")
+        self._sha256.update(chunk)
+        self._buffer.append(chunk)
+        self.buffered += len(chunk)
+
+    def flush(self) -> None:
+        """Write the buffered chunks to the temp file, creating it on first use"""
+        if self._file is None:
+            fd, tmp_name = tempfile.mkstemp(dir=self.directory, prefix='.upload-', suffix='.tmp')
+            self._tmp_path = Path(tmp_name)
+            self._file = os.fdopen(fd, 'wb')
+        buffer, self._buffer, self.buffered = self._buffer, [], 0
+        self._file.writelines(buffer)
+
+    def commit(self, final_path: Path) -> None:
+        """Write what is left, close the temp file and atomically move it to its final path"""
+        self.flush()
+        self._file.close()
+        os.replace(self._tmp_path, final_path)
+
+    def abort(self) -> None:
+        """Drop the buffer, close and remove the temp file"""
+        self._buffer, self.buffered = [], 0
+        if self._file is None:
+            return
+        self._file.close()
+        try:
+            self._tmp_path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(
+        status_code=400,
+        detail=f"File too large. Maximum size is {config.MAX_FILE_SIZE / 1024 / 1024}MB"
+    )
+
+
+async def receive_upload(
+    request: Request,
+    storage: Storage,
+    field_name: str = 'file',
+    validate_filename: Optional[Callable[[str], None]] = None
+) -> Dict:
+    """Stream a single multipart file field into ``storage``
+
+    Oversized uploads are rejected from Content-Length before the body is
+    read when possible, and otherwise as soon as the limit is crossed.
+    ``validate_filename`` runs on the client filename before any data is
+    written and may raise HTTPException to abort.
+
+    Returns the stored unique filename, original name, size, SHA-256 hex
+    digest and storage location of the saved file.
+    """
+    content_type, params = parse_options_header(request.headers.get('content-type'))
+    boundary = params.get(b'boundary')
+    if content_type != b'multipart/form-data' or not boundary:
+        raise HTTPException(status_code=400, detail="No file uploaded")
+
+    content_length = request.headers.get('content-length')
+    if content_length and content_length.isdigit():
+        # Allow some slack for multipart framing and other form fields
+        if int(content_length) > config.MAX_FILE_SIZE + 64 * 1024:
+            log.warning(f"Upload rejected by Content-Length: {content_length} bytes")
+            raise _too_large()
+
+    state = {
+        'headers': {},
+        'header_field': b'',
+        'header_value': b'',
+        'writer': None,
+        'filename': None,
+        'in_file': False
+    }
+
+    def on_part_begin():
+        state['headers'] = {}
+        state['in_file'] = False
+
+    def on_header_field(data, start, end):
+        state['header_field'] += data[start:end]
+
+    def on_header_value(data, start, end):
+        state['header_value'] += data[start:end]
+
+    def on_header_end():
+        state['headers'][state['header_field'].lower()] = state['header_value']
+        state['header_field'] = b''
+        state['header_value'] = b''
+
+    def on_headers_finished():
+        _, options = parse_options_header(state['headers'].get(b'content-disposition'))
+        name = options.get(b'name', b'').decode('utf-8', 'replace')
+        if name != field_name or b'filename' not in options or state['writer'] is not None:
+            return
+        filename = options[b'filename'].decode('utf-8', 'replace')
+        if validate_filename:
+            validate_filename(filename)
+        state['filename'] = filename
+        state['writer'] = StreamingFileWriter(storage.staging_directory(UPLOADS), config.MAX_FILE_SIZE)
+        state['in_file'] = True
+
+    def on_part_data(data, start, end):
+        if state['in_file']:
+            state['writer'].write(data[start:end])
+
+    def on_part_end():
+        state['in_file'] = False
+
+    parser = MultipartParser(boundary, {
+        'on_part_begin': on_part_begin,
+        'on_header_field': on_header_field,
+        'on_header_value': on_header_value,
+        'on_header_end': on_header_end,
+        'on_headers_finished': on_headers_finished,
+        'on_part_data': on_part_data,
+        'on_part_end': on_part_end
+    })
+
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            # Disk writes happen off the event loop, in batches
+            writer = state['writer']
+            if writer is not None and writer.buffered >= UPLOAD_FLUSH_BYTES:
+                await asyncio.to_thread(writer.flush)
+        parser.finalize()
+    except UploadTooLargeError:
+        await asyncio.to_thread(state['writer'].abort)
+        log.warning(f"Upload aborted after exceeding {config.MAX_FILE_SIZE} bytes")
+        raise _too_large()
+    except BaseException:
+        if state['writer'] is not None:
+            await asyncio.to_thread(state['writer'].abort)
+        raise
+
+    writer = state['writer']
+    if writer is None:
+        raise HTTPException(status_code=400, detail="No file uploaded")
+
+    unique_filename, file_path = storage.allocate(UPLOADS, state['filename'])
+    try:
+        await asyncio.to_thread(writer.commit, file_path)
+    except BaseException:
+        await asyncio.to_thread(writer.abort)
+        storage.discard(file_path)
+        raise
+    await asyncio.to_thread(storage.commit, UPLOADS, unique_filename, file_path)
+
+    return {
+        'filename': unique_filename,
+        'originalName': state['filename'],
+        'size': writer.size,
+        'contentHash': writer.digest,
+        'path': storage.location(UPLOADS, unique_filename)
+    }
@@ -0,0 +1,180 @@
+"""
+Conversion worker pool for mdLaTeX2Word backend
+Runs blocking conversions off the event loop with bounded admission
+"""
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+import config
+from utils import log
+
+
+class PoolFullError(Exception):
+    """Raised when the conversion queue has no free slot"""
+
+
+class ConversionPool:
+    """Bounded worker pool for CPU-bound conversion tasks
+
+    At most ``workers + queue_size`` tasks are admitted at a time (running plus
+    waiting). Further submissions fail fast with PoolFullError instead of
+    piling up behind a long conversion.
+    """
+
+    def __init__(self, kind: str = 'thread', workers: int = 1, queue_size: int = 0):
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.capacity = self.workers + max(0, queue_size)
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = self._create_executor()
+
+    def _create_executor(self) -> Executor:
+        if self.kind == 'process':
+            # Spawn, not fork: the server process runs threads (log writer,
+            # scheduler, thread pools) whose locks a forked child would inherit
+            # in whatever state they were in
+            return ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        if self.kind != 'thread':
+            log.warning(f"Unknown conversion executor '{self.kind}', falling back to threads")
+            self.kind = 'thread'
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='convert')
+
+    @property
+    def pending(self) -> int:
+        """Number of admitted tasks (running or queued)"""
+        return self._pending
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of admitted tasks still waiting for a worker"""
+        return max(0, self._pending - self.workers)
+
+    def _release(self, _future: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """Submit a task, raising PoolFullError if the queue is full"""
+        with self._lock:
+            if self._pending >= self.capacity:
+                raise PoolFullError(f"Conversion queue full ({self._pending}/{self.capacity})")
+            self._pending += 1
+
+        try:
+            future = self._executor.submit(func, *args, **kwargs)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(
+        self,
+        func: Callable,
+        *args,
+        timeout: Optional[float] = None,
+        on_abandon: Optional[Callable[[], None]] = None,
+        **kwargs
+    ) -> Any:
+        """Run a task on the pool and await its result
+
+        Raises PoolFullError when rejected and asyncio.TimeoutError when the
+        task does not finish within ``timeout`` seconds. A timed out task that
+        is still queued is cancelled; one that is already running keeps its
+        slot until it finishes, and ``on_abandon`` is called then to clean up
+        after it (e.g. remove the output it wrote).
+        """
+        future = self.submit(func, *args, **kwargs)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=timeout)
+        except asyncio.TimeoutError:
+            if not future.cancel() and on_abandon is not None:
+                future.add_done_callback(lambda _: on_abandon())
+            raise
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Shutdown the underlying executor"""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+# Global pool instance
+_pool: Optional[ConversionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_conversion_pool() -> ConversionPool:
+    """Get the global conversion pool, creating it on first use"""
+    global _pool
+
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConversionPool(
+                    kind=config.CONVERSION_EXECUTOR,
+                    workers=config.CONVERSION_WORKERS,
+                    queue_size=config.CONVERSION_QUEUE_SIZE
+                )
+                log.info(
+                    f"Conversion pool initialized ({_pool.kind}, "
+                    f"{_pool.workers} workers, capacity {_pool.capacity})"
+                )
+    return _pool
+
+
+def shutdown_conversion_pool() -> None:
+    """Shutdown the global conversion pool"""
+    global _pool
+
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+            _pool = None
+            log.info("Conversion pool shutdown")
+
+
+# Process pool used to render the formulas of one document in parallel
+_formula_pool: Optional[ProcessPoolExecutor] = None
+_formula_pool_lock = threading.Lock()
+
+
+def get_formula_pool() -> Optional[ProcessPoolExecutor]:
+    """Get the formula rendering pool, creating it on first use
+
+    Returns None when FORMULA_WORKERS is below 2 and inside worker
+    processes, which must not start pools of their own.
+    """
+    global _formula_pool
+
+    if config.FORMULA_WORKERS < 2 or multiprocessing.parent_process() is not None:
+        return None
+    if _formula_pool is None:
+        with _formula_pool_lock:
+            if _formula_pool is None:
+                # Spawned rather than forked: the server process runs threads
+                # (event loop, log writer, conversion threads) that may hold locks
+                _formula_pool = ProcessPoolExecutor(
+                    max_workers=config.FORMULA_WORKERS,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+                log.info(f"Formula pool initialized ({config.FORMULA_WORKERS} workers)")
+    return _formula_pool
+
+
+def shutdown_formula_pool() -> None:
+    """Shutdown the formula rendering pool"""
+    global _formula_pool
+
+    with _formula_pool_lock:
+        if _formula_pool is not None:
+            _formula_pool.shutdown(wait=False, cancel_futures=True)
+            _formula_pool = None
+            log.info("Formula pool shutdown")